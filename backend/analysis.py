@@ -0,0 +1,420 @@
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from matching import (
+    build_coverage_index, build_first_row_map, build_fmeca_designator_sets, build_match_keys,
+    find_missing_designators, match_atm_coverage
+)
+from workers import run_cpu_task
+
+# RPN buckets offered by FilterRequest.filter_type ("all" and unknown types keep every row)
+RPN_FILTERS = {
+    "red": lambda rpn: rpn >= 70,
+    "orange": lambda rpn: (rpn < 70) & (rpn >= 60),
+    "yellow": lambda rpn: (rpn < 60) & (rpn >= 50),
+    "green": lambda rpn: rpn < 50,
+}
+
+# Keys of the FMECAData rows, in the column order of the joined frame
+FMECA_ROW_KEYS = ("ID", "Component", "Reference_Designator", "RPN", "ATM_Coverage")
+
+# ==================== COLUMN DETECTION ====================
+
+def detect_fmeca_columns(df: pd.DataFrame) -> Tuple:
+    """Find the (ID, Component, Reference Designator, RPN) columns of a FMECA sheet"""
+    id_col = None
+    component_col = None
+    designator_col = None
+    rpn_col = None
+
+    for col in df.columns:
+        col_lower = str(col).lower()
+        if 'id' in col_lower and not id_col:
+            id_col = col
+        elif 'component' in col_lower and not component_col:
+            component_col = col
+        elif 'reference' in col_lower and 'designator' in col_lower and not designator_col:
+            designator_col = col
+        elif 'rpn' in col_lower and not rpn_col:
+            rpn_col = col
+
+    if not all([id_col, component_col, designator_col, rpn_col]):
+        cols = df.columns.tolist()
+        if len(cols) >= 4:
+            id_col = cols[0] if not id_col else id_col
+            component_col = cols[1] if not component_col else component_col
+            designator_col = cols[2] if not designator_col else designator_col
+            rpn_col = cols[3] if not rpn_col else rpn_col
+
+    return id_col, component_col, designator_col, rpn_col
+
+def detect_coverage_columns(ref_df: pd.DataFrame) -> Tuple:
+    """Find the (CRD, Result) columns of a coverage sheet, first match wins"""
+    crd_col = None
+    result_col = None
+
+    for col in ref_df.columns:
+        col_lower = str(col).lower()
+        if 'crd' in col_lower and not crd_col:
+            crd_col = col
+        elif 'result' in col_lower and not result_col:
+            result_col = col
+
+    if not crd_col or not result_col:
+        ref_cols = ref_df.columns.tolist()
+        if len(ref_cols) >= 2:
+            crd_col = ref_cols[0] if not crd_col else crd_col
+            result_col = ref_cols[1] if not result_col else result_col
+
+    return crd_col, result_col
+
+def detect_atm_designator_column(df: pd.DataFrame) -> Any:
+    """Find the Reference Designator column used by the ATM check"""
+    for col in df.columns:
+        if 'reference' in str(col).lower() and 'designator' in str(col).lower():
+            return col
+
+    if len(df.columns) == 0:
+        return None
+    return df.columns[2] if len(df.columns) > 2 else df.columns[0]
+
+def detect_atm_coverage_columns(ref_df: pd.DataFrame) -> Tuple:
+    """Find the (CRD, Result) columns used by the ATM check, last match wins"""
+    crd_col = None
+    result_col = None
+    for col in ref_df.columns:
+        col_lower = str(col).lower()
+        if 'crd' in col_lower:
+            crd_col = col
+        elif 'result' in col_lower:
+            result_col = col
+
+    if not crd_col or not result_col:
+        ref_cols = ref_df.columns.tolist()
+        if len(ref_cols) >= 2:
+            crd_col = ref_cols[0] if not crd_col else crd_col
+            result_col = ref_cols[1] if not result_col else result_col
+
+    return crd_col, result_col
+
+def detect_column_roles(df: pd.DataFrame, file_type: str) -> Dict[str, Any]:
+    """
+    Role -> column mapping of a sheet for the analysis stages. Detected
+    once at upload and stored with the sheet, so analysis loads only
+    these columns.
+    """
+    if file_type == "fmeca":
+        id_col, component_col, designator_col, rpn_col = detect_fmeca_columns(df)
+        return {
+            "id": id_col,
+            "component": component_col,
+            "designator": designator_col,
+            "rpn": rpn_col,
+            "atm_designator": detect_atm_designator_column(df)
+        }
+
+    crd_col, result_col = detect_coverage_columns(df)
+    atm_crd_col, atm_result_col = detect_atm_coverage_columns(df)
+    return {
+        "crd": crd_col,
+        "result": result_col,
+        "atm_crd": atm_crd_col,
+        "atm_result": atm_result_col
+    }
+
+def role_columns(roles: Dict[str, Any]) -> List:
+    """Distinct columns referenced by a role mapping, in role order"""
+    columns = []
+    for column in roles.values():
+        if column is not None and column not in columns:
+            columns.append(column)
+    return columns
+
+# ==================== DESIGNATOR INDEX ====================
+
+# Bumped when build_designator_index gains lookups (migrate.py rebuilds older indexes)
+DESIGNATOR_INDEX_VERSION = 2
+
+# Bumped when the coverage join or the ATM check change their results (stored results are then ignored)
+ANALYSIS_RESULT_VERSION = 1
+
+def build_designator_index(df: pd.DataFrame, file_type: str, roles: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Precompute the designator lookups of a sheet at upload, so analysis
+    requests run no designator regexes. df must be the sheet as analysis
+    loads it back from storage. Each lookup depends on this sheet alone,
+    so it is reused whatever version of the other side it is analyzed with.
+
+    FMECA: {"tokens", "parenthesized"} lists of build_fmeca_designator_sets
+    (ATM check) and {"match_texts", "match_keys"} designator strings and
+    their designator_match_keys (coverage join).
+    Coverage: {"last_row"} designator -> last row (coverage join) and
+    {"first_row"} designator -> first row (ATM check).
+    """
+    index = {"index_version": DESIGNATOR_INDEX_VERSION}
+    if file_type == "fmeca":
+        if roles["atm_designator"] is not None:
+            tokens, parenthesized = build_fmeca_designator_sets(df[roles["atm_designator"]])
+            index.update(tokens=sorted(tokens), parenthesized=sorted(parenthesized))
+        if roles["designator"] is not None:
+            # Same normalization as join_coverage applies before matching
+            index["match_texts"], index["match_keys"] = build_match_keys(df[roles["designator"]].astype(str).str.upper())
+        return index
+
+    if roles["crd"] is not None:
+        # Same normalization as join_coverage applies before matching
+        index["last_row"], _ = build_coverage_index(df[roles["crd"]].astype(str).str.upper())
+    if roles["atm_crd"] is not None:
+        index["first_row"] = build_first_row_map(df[roles["atm_crd"]])
+    return index
+
+# ==================== ANALYSIS STAGES ====================
+# Module-level so they can run on the worker pool
+
+def join_coverage(
+    fmeca_df: pd.DataFrame,
+    coverage_df: pd.DataFrame,
+    fmeca_roles: Optional[Dict[str, Any]] = None,
+    coverage_roles: Optional[Dict[str, Any]] = None,
+    coverage_index: Optional[Dict[str, Any]] = None,
+    fmeca_index: Optional[Dict[str, Any]] = None,
+    atm_coverage: Optional[List[str]] = None
+) -> Tuple[pd.DataFrame, Tuple]:
+    """
+    Sort all FMECA rows by RPN (descending) and attach their "ATM Coverage"
+    result. atm_coverage, the results of an earlier join of the same two
+    sheets in FMECA row order, skips the matching.
+    """
+    fmeca_roles = fmeca_roles or detect_column_roles(fmeca_df, "fmeca")
+    coverage_roles = coverage_roles or detect_column_roles(coverage_df, "coverage")
+
+    id_col, component_col, designator_col, rpn_col = (
+        fmeca_roles["id"], fmeca_roles["component"], fmeca_roles["designator"], fmeca_roles["rpn"]
+    )
+    print(f"📝 Using columns - ID: {id_col}, Component: {component_col}, Designator: {designator_col}, RPN: {rpn_col}")
+
+    joined = fmeca_df[[id_col, component_col, designator_col, rpn_col]].copy()
+    joined[rpn_col] = pd.to_numeric(joined[rpn_col], errors='coerce')
+    joined = joined.sort_values(by=rpn_col, ascending=False, kind='stable')
+
+    joined["ATM Coverage"] = "Not Found"
+
+    crd_col, result_col = coverage_roles["crd"], coverage_roles["result"]
+    if crd_col and result_col:
+        joined[designator_col] = joined[designator_col].astype(str).str.upper()
+        if atm_coverage is not None:
+            joined["ATM Coverage"] = pd.Series(atm_coverage, index=fmeca_df.index).loc[joined.index].tolist()
+            return joined, (id_col, component_col, designator_col, rpn_col)
+
+        last_row = (coverage_index or {}).get("last_row")
+        crd_values = coverage_df[crd_col].astype(str).str.upper() if last_row is None else None
+        match_keys = None
+        if fmeca_index and "match_texts" in fmeca_index:
+            match_keys = dict(zip(fmeca_index["match_texts"], fmeca_index["match_keys"]))
+
+        joined["ATM Coverage"] = match_atm_coverage(
+            joined[designator_col].tolist(), crd_values, coverage_df[result_col].tolist(), last_row=last_row,
+            match_keys=match_keys
+        )
+
+    return joined, (id_col, component_col, designator_col, rpn_col)
+
+def check_missing_designators(
+    fmeca_df: pd.DataFrame,
+    coverage_df: pd.DataFrame,
+    fmeca_roles: Optional[Dict[str, Any]] = None,
+    coverage_roles: Optional[Dict[str, Any]] = None,
+    fmeca_index: Optional[Dict[str, Any]] = None,
+    coverage_index: Optional[Dict[str, Any]] = None
+) -> List[Tuple[str, str]]:
+    """Sorted (designator, result) pairs found in coverage but missing in FMECA"""
+    fmeca_roles = fmeca_roles or detect_column_roles(fmeca_df, "fmeca")
+    coverage_roles = coverage_roles or detect_column_roles(coverage_df, "coverage")
+
+    fmeca_sets = None
+    if fmeca_index and "tokens" in fmeca_index:
+        fmeca_sets = (set(fmeca_index["tokens"]), set(fmeca_index["parenthesized"]))
+
+    return find_missing_designators(
+        fmeca_df[fmeca_roles["atm_designator"]],
+        coverage_df[coverage_roles["atm_crd"]],
+        coverage_df[coverage_roles["atm_result"]],
+        fmeca_sets=fmeca_sets,
+        first_row=(coverage_index or {}).get("first_row")
+    )
+
+def fmeca_columns_from_frame(joined: pd.DataFrame) -> Dict[str, List[str]]:
+    """FMECAData fields of (a slice of) the joined frame as one value list per field"""
+    # tolist() boxes values the way iterrows did (Timestamp, int, float), so str() matches
+    return {
+        key: [str(value) for value in joined.iloc[:, position].tolist()]
+        for position, key in enumerate(FMECA_ROW_KEYS)
+    }
+
+def fmeca_rows_from_frame(joined: pd.DataFrame) -> List[Dict[str, str]]:
+    """FMECAData-shaped rows of (a slice of) the joined frame, built column by column"""
+    columns = fmeca_columns_from_frame(joined).values()
+    return [dict(zip(FMECA_ROW_KEYS, values)) for values in zip(*columns)]
+
+# ==================== BOARD ANALYSIS ====================
+
+class BoardAnalysis:
+    """
+    Analysis of one (FMECA version, coverage version) pair of a board.
+    The frames may hold only the columns named by their role mappings;
+    designator indexes stored at upload spare the regex scans.
+
+    The coverage join and the ATM check run on the worker pool on first use
+    and are kept, so every RPN filter is a slice of the same joined,
+    RPN-sorted frame. Errors are not cached and are raised again on the
+    next call.
+
+    stored_result holds the results of an earlier analysis of the same two
+    versions ({"atm_coverage", "missing"}, either may be absent); parts
+    it lacks are computed and passed to save_result for the next process.
+    """
+
+    def __init__(
+        self,
+        fmeca_df: pd.DataFrame,
+        coverage_df: pd.DataFrame,
+        fmeca_roles: Optional[Dict[str, Any]] = None,
+        coverage_roles: Optional[Dict[str, Any]] = None,
+        fmeca_index: Optional[Dict[str, Any]] = None,
+        coverage_index: Optional[Dict[str, Any]] = None,
+        stored_result: Optional[Dict[str, Any]] = None,
+        save_result: Optional[Callable[[Dict[str, Any]], Awaitable]] = None
+    ):
+        self.fmeca_df = fmeca_df
+        self.coverage_df = coverage_df
+        self.fmeca_roles = fmeca_roles
+        self.coverage_roles = coverage_roles
+        self.fmeca_index = fmeca_index
+        self.coverage_index = coverage_index
+        self.stored_result = stored_result or {}
+        self.save_result = save_result
+        self.columns = None
+        self._joined = None
+        self._rows = {}
+        self._missing = None
+        self._lock = asyncio.Lock()
+        # Separate lock, so summary() runs the join and the ATM check side by side
+        self._missing_lock = asyncio.Lock()
+
+    async def joined(self) -> pd.DataFrame:
+        """All FMECA rows sorted by RPN (descending) with their "ATM Coverage" result"""
+        if self._joined is None:
+            async with self._lock:
+                if self._joined is None:
+                    atm_coverage = self.stored_result.get("atm_coverage")
+                    if atm_coverage is not None and len(atm_coverage) == len(self.fmeca_df):
+                        # Only the sort is left to do, which doesn't need the worker pool
+                        self._joined, self.columns = join_coverage(
+                            self.fmeca_df, self.coverage_df, self.fmeca_roles, self.coverage_roles,
+                            atm_coverage=atm_coverage
+                        )
+                        return self._joined
+
+                    self._joined, self.columns = await run_cpu_task(
+                        "coverage_join", join_coverage,
+                        self.fmeca_df, self.coverage_df, self.fmeca_roles, self.coverage_roles,
+                        self.coverage_index, self.fmeca_index
+                    )
+                    if self.save_result is not None:
+                        await self.save_result({
+                            "atm_coverage": self._joined["ATM Coverage"].reindex(self.fmeca_df.index).tolist()
+                        })
+        return self._joined
+
+    async def filtered(self, filter_type: str) -> pd.DataFrame:
+        """Slice of the joined frame for one RPN bucket"""
+        joined = await self.joined()
+        rpn_filter = RPN_FILTERS.get(filter_type)
+        if rpn_filter is None:
+            return joined
+        return joined[rpn_filter(joined[self.columns[3]])]
+
+    async def fmeca_rows(self, filter_type: str) -> List[Dict[str, str]]:
+        """FMECAData-shaped rows for one RPN bucket, built once per bucket"""
+        if filter_type not in RPN_FILTERS:
+            filter_type = "all"
+        rows = self._rows.get(filter_type)
+        if rows is None:
+            rows = fmeca_rows_from_frame(await self.filtered(filter_type))
+            self._rows[filter_type] = rows
+        return rows
+
+    async def fmeca_row_batches(
+        self, filter_type: str, offset: int, limit: Optional[int], batch_size: int
+    ) -> AsyncIterator[List[Dict[str, str]]]:
+        """
+        FMECAData-shaped rows [offset, offset + limit) of one RPN bucket in
+        batches, built as they are consumed unless the bucket is cached
+        """
+        if filter_type not in RPN_FILTERS:
+            filter_type = "all"
+        cached = self._rows.get(filter_type)
+        df_filtered = await self.filtered(filter_type) if cached is None else None
+        total = len(cached) if cached is not None else len(df_filtered)
+        stop = total if limit is None else min(total, offset + limit)
+
+        for start in range(offset, stop, batch_size):
+            end = min(stop, start + batch_size)
+            if cached is not None:
+                yield cached[start:end]
+            else:
+                yield fmeca_rows_from_frame(df_filtered.iloc[start:end])
+            # Let other requests run between batches
+            await asyncio.sleep(0)
+
+    async def fmeca_columns(self, filter_type: str, offset: int, stop: int) -> Dict[str, List[str]]:
+        """Rows [offset, stop) of one RPN bucket in columnar form ({field: values})"""
+        if filter_type not in RPN_FILTERS:
+            filter_type = "all"
+        cached = self._rows.get(filter_type)
+        if cached is not None:
+            rows = cached[offset:stop]
+            return {key: [row[key] for row in rows] for key in FMECA_ROW_KEYS}
+        return fmeca_columns_from_frame((await self.filtered(filter_type)).iloc[offset:stop])
+
+    async def fmeca_row_count(self, filter_type: str) -> int:
+        if filter_type not in RPN_FILTERS:
+            filter_type = "all"
+        cached = self._rows.get(filter_type)
+        return len(cached) if cached is not None else len(await self.filtered(filter_type))
+
+    async def summary(self) -> Dict[str, Any]:
+        """RPN bucket counts, coverage share and missing designator count of the board"""
+        joined, missing = await asyncio.gather(self.joined(), self.missing_components())
+        rpn = joined[self.columns[3]]
+        rows = len(joined)
+        covered = int((joined["ATM Coverage"] != "Not Found").sum())
+        return {
+            "rows": rows,
+            "rpn_buckets": {filter_type: int(rpn_filter(rpn).sum()) for filter_type, rpn_filter in RPN_FILTERS.items()},
+            "covered_rows": covered,
+            "coverage_percent": round(100 * covered / rows, 1) if rows else None,
+            "missing_designators": len(missing)
+        }
+
+    async def missing_components(self) -> List[Tuple[str, str]]:
+        """Sorted (designator, result) pairs found in coverage but missing in FMECA"""
+        if self._missing is None:
+            async with self._missing_lock:
+                if self._missing is None:
+                    stored = self.stored_result.get("missing")
+                    if stored is not None:
+                        self._missing = [tuple(pair) for pair in stored]
+                        return self._missing
+
+                    missing = await run_cpu_task(
+                        "atm_check", check_missing_designators,
+                        self.fmeca_df, self.coverage_df, self.fmeca_roles, self.coverage_roles,
+                        self.fmeca_index, self.coverage_index
+                    )
+                    if self.save_result is not None:
+                        await self.save_result({"missing": [list(pair) for pair in missing]})
+                    self._missing = missing
+        return self._missing
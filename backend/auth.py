@@ -4,9 +4,12 @@ from datetime import datetime, timedelta
 from typing import Optional, List
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+import asyncio
 from pydantic import BaseModel, EmailStr, validator
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import DuplicateKeyError
 from bson import ObjectId
+from cache import LRUCache
 # Load environment variables
 load_dotenv()
 
@@ -14,9 +17,15 @@ load_dotenv()
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "fmeca_db")
 USERS_COLLECTION = "users"
-
-# Initialize MongoDB client
-client = MongoClient(MONGODB_URL)
+MONGODB_MAX_POOL_SIZE = int(os.getenv("MONGODB_MAX_POOL_SIZE", "100"))
+MONGODB_MIN_POOL_SIZE = int(os.getenv("MONGODB_MIN_POOL_SIZE", "0"))
+
+# Initialize pooled async MongoDB client (shared by every request on the event loop)
+client = AsyncIOMotorClient(
+    MONGODB_URL,
+    maxPoolSize=MONGODB_MAX_POOL_SIZE,
+    minPoolSize=MONGODB_MIN_POOL_SIZE
+)
 db = client[DATABASE_NAME]
 users_collection = db.users
 
@@ -25,6 +34,12 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-this-in-production"
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
+# Authenticated principal cache (per process; entries expire after the TTL)
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "1024"))
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "30"))
+principal_cache = LRUCache("principals", PRINCIPAL_CACHE_SIZE, ttl_seconds=PRINCIPAL_CACHE_TTL)
+_principal_generation = 0
+
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -122,21 +137,21 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 # Database operations
-def create_indexes():
+async def create_indexes():
     """Create database indexes"""
     try:
-        users_collection.create_index("username", unique=True)
-        users_collection.create_index("email", unique=True, sparse=True)
-        users_collection.create_index("created_at")
-        users_collection.create_index("role")
+        await users_collection.create_index("username", unique=True)
+        await users_collection.create_index("email", unique=True, sparse=True)
+        await users_collection.create_index("created_at")
+        await users_collection.create_index("role")
         print("✅ Database indexes created successfully")
     except Exception as e:
         print(f"⚠️ Error creating indexes: {e}")
 
-def get_user_by_id(user_id: str) -> Optional[UserInDB]:
+async def get_user_by_id(user_id: str) -> Optional[UserInDB]:
     """Get user by ID"""
     try:
-        user_data = users_collection.find_one({"_id": ObjectId(user_id)})
+        user_data = await users_collection.find_one({"_id": ObjectId(user_id)})
         if user_data:
             user_data["id"] = str(user_data["_id"])
             return UserInDB(**user_data)
@@ -144,10 +159,10 @@ def get_user_by_id(user_id: str) -> Optional[UserInDB]:
         print(f"Error getting user by ID: {e}")
     return None
 
-def get_user_by_username(username: str) -> Optional[UserInDB]:
+async def get_user_by_username(username: str) -> Optional[UserInDB]:
     """Get user by username"""
     try:
-        user_data = users_collection.find_one({"username": username})
+        user_data = await users_collection.find_one({"username": username})
         if user_data:
             user_data["id"] = str(user_data["_id"])
             return UserInDB(**user_data)
@@ -155,10 +170,29 @@ def get_user_by_username(username: str) -> Optional[UserInDB]:
         print(f"Error getting user by username: {e}")
     return None
 
-def get_user_by_email(email: str) -> Optional[UserInDB]:
+async def get_cached_user_by_username(username: str) -> Optional[UserInDB]:
+    """Get user by username through the short-TTL principal cache"""
+    user = principal_cache.get(username)
+    if user is not None:
+        return user
+    
+    generation = _principal_generation
+    user = await get_user_by_username(username)
+    # Skip caching if the user was invalidated while we were reading it
+    if user is not None and generation == _principal_generation:
+        principal_cache.put(username, user)
+    return user
+
+def invalidate_cached_user(username: str):
+    """Drop a user from the principal cache after it changes"""
+    global _principal_generation
+    _principal_generation += 1
+    principal_cache.invalidate(lambda key: key == username)
+
+async def get_user_by_email(email: str) -> Optional[UserInDB]:
     """Get user by email"""
     try:
-        user_data = users_collection.find_one({"email": email})
+        user_data = await users_collection.find_one({"email": email})
         if user_data:
             user_data["id"] = str(user_data["_id"])
             return UserInDB(**user_data)
@@ -166,12 +200,12 @@ def get_user_by_email(email: str) -> Optional[UserInDB]:
         print(f"Error getting user by email: {e}")
     return None
 
-def get_users_by_role(role: str, skip: int = 0, limit: int = 100) -> List[UserInDB]:
+async def get_users_by_role(role: str, skip: int = 0, limit: int = 100) -> List[UserInDB]:
     """Get users by role"""
     try:
         cursor = users_collection.find({"role": role}).skip(skip).limit(limit)
         users = []
-        for user in cursor:
+        async for user in cursor:
             user["id"] = str(user["_id"])
             users.append(UserInDB(**user))
         return users
@@ -179,21 +213,21 @@ def get_users_by_role(role: str, skip: int = 0, limit: int = 100) -> List[UserIn
         print(f"Error getting users by role: {e}")
         return []
 
-def create_user(user_data: UserCreate) -> UserResponse:
+async def create_user(user_data: UserCreate) -> UserResponse:
     """Create a new user"""
     # Check if username already exists
-    existing_user = get_user_by_username(user_data.username)
+    existing_user = await get_user_by_username(user_data.username)
     if existing_user:
         raise ValueError(f"Username '{user_data.username}' already exists")
     
     # Check if email already exists
     if user_data.email:
-        existing_email = get_user_by_email(user_data.email)
+        existing_email = await get_user_by_email(user_data.email)
         if existing_email:
             raise ValueError(f"Email '{user_data.email}' already exists")
     
-    # Hash password
-    hashed_password = get_password_hash(user_data.password)
+    # Hash password (bcrypt is CPU-bound, keep it off the event loop)
+    hashed_password = await asyncio.to_thread(get_password_hash, user_data.password)
     
     # Create user document
     user_dict = user_data.dict(exclude={"password"})
@@ -204,17 +238,17 @@ def create_user(user_data: UserCreate) -> UserResponse:
     })
     
     try:
-        result = users_collection.insert_one(user_dict)
+        result = await users_collection.insert_one(user_dict)
         user_dict["_id"] = result.inserted_id
         user_dict["id"] = str(result.inserted_id)
         
         return UserResponse(**user_dict)
-    except pymongo.errors.DuplicateKeyError as e:
+    except DuplicateKeyError as e:
         raise ValueError("Username or email already exists") from e
     except Exception as e:
         raise ValueError(f"Error creating user: {e}") from e
 
-def update_user(username: str, user_update: UserUpdate) -> Optional[UserInDB]:
+async def update_user(username: str, user_update: UserUpdate) -> Optional[UserInDB]:
     """Update user information"""
     try:
         update_data = user_update.dict(exclude_unset=True)
@@ -222,17 +256,18 @@ def update_user(username: str, user_update: UserUpdate) -> Optional[UserInDB]:
         
         # If email is being updated, check if it already exists
         if "email" in update_data and update_data["email"]:
-            existing_user = get_user_by_email(update_data["email"])
+            existing_user = await get_user_by_email(update_data["email"])
             if existing_user and existing_user.username != username:
                 raise ValueError("Email already exists")
         
-        result = users_collection.update_one(
+        result = await users_collection.update_one(
             {"username": username},
             {"$set": update_data}
         )
+        invalidate_cached_user(username)
         
         if result.modified_count > 0:
-            return get_user_by_username(username)
+            return await get_user_by_username(username)
         return None
     except ValueError as e:
         raise e
@@ -240,10 +275,10 @@ def update_user(username: str, user_update: UserUpdate) -> Optional[UserInDB]:
         print(f"Error updating user: {e}")
         return None
 
-def update_user_last_login(username: str):
+async def update_user_last_login(username: str):
     """Update user's last login timestamp"""
     try:
-        users_collection.update_one(
+        await users_collection.update_one(
             {"username": username},
             {
                 "$set": {
@@ -252,14 +287,15 @@ def update_user_last_login(username: str):
                 }
             }
         )
+        invalidate_cached_user(username)
     except Exception as e:
         print(f"Error updating last login: {e}")
 
-def update_user_password(username: str, new_password: str):
+async def update_user_password(username: str, new_password: str):
     """Update user's password"""
-    hashed_password = get_password_hash(new_password)
+    hashed_password = await asyncio.to_thread(get_password_hash, new_password)
     try:
-        users_collection.update_one(
+        await users_collection.update_one(
             {"username": username},
             {
                 "$set": {
@@ -268,15 +304,16 @@ def update_user_password(username: str, new_password: str):
                 }
             }
         )
+        invalidate_cached_user(username)
     except Exception as e:
         print(f"Error updating password: {e}")
 
-def get_all_users(skip: int = 0, limit: int = 100) -> List[UserInDB]:
+async def get_all_users(skip: int = 0, limit: int = 100) -> List[UserInDB]:
     """Get all users (for admin purposes)"""
     try:
         cursor = users_collection.find().skip(skip).limit(limit)
         users = []
-        for user in cursor:
+        async for user in cursor:
             user["id"] = str(user["_id"])
             users.append(UserInDB(**user))
         return users
@@ -284,16 +321,17 @@ def get_all_users(skip: int = 0, limit: int = 100) -> List[UserInDB]:
         print(f"Error getting all users: {e}")
         return []
 
-def delete_user(username: str):
+async def delete_user(username: str):
     """Delete a user (for admin purposes)"""
     try:
-        result = users_collection.delete_one({"username": username})
+        result = await users_collection.delete_one({"username": username})
+        invalidate_cached_user(username)
         return result.deleted_count > 0
     except Exception as e:
         print(f"Error deleting user: {e}")
         return False
 
-def search_users(search_term: str, skip: int = 0, limit: int = 100) -> List[UserInDB]:
+async def search_users(search_term: str, skip: int = 0, limit: int = 100) -> List[UserInDB]:
     """Search users by username, email, or full name"""
     try:
         query = {
@@ -305,7 +343,7 @@ def search_users(search_term: str, skip: int = 0, limit: int = 100) -> List[User
         }
         cursor = users_collection.find(query).skip(skip).limit(limit)
         users = []
-        for user in cursor:
+        async for user in cursor:
             user["id"] = str(user["_id"])
             users.append(UserInDB(**user))
         return users
@@ -314,16 +352,16 @@ def search_users(search_term: str, skip: int = 0, limit: int = 100) -> List[User
         return []
 
 # Authentication
-def authenticate_user(username: str, password: str) -> Optional[UserInDB]:
+async def authenticate_user(username: str, password: str) -> Optional[UserInDB]:
     """Authenticate user with username and password"""
-    user = get_user_by_username(username)
+    user = await get_user_by_username(username)
     if not user:
         return None
-    if not verify_password(password, user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password, user.hashed_password):
         return None
     return user
 
-def register_user(user_data: RegisterRequest) -> UserResponse:
+async def register_user(user_data: RegisterRequest) -> UserResponse:
     """Register a new user"""
     user_create = UserCreate(
         username=user_data.username,
@@ -333,7 +371,7 @@ def register_user(user_data: RegisterRequest) -> UserResponse:
         disabled=False,
         role=user_data.role
     )
-    return create_user(user_create)
+    return await create_user(user_create)
 
 # JWT Token creation
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -348,7 +386,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 # Initialize default users
-def init_default_users():
+async def init_default_users():
     """Initialize default users if they don't exist"""
     default_users = [
         {
@@ -364,11 +402,11 @@ def init_default_users():
     ]
     
     for user_data in default_users:
-        existing_user = get_user_by_username(user_data["username"])
+        existing_user = await get_user_by_username(user_data["username"])
         if not existing_user:
             try:
                 user_create = UserCreate(**user_data)
-                create_user(user_create)
+                await create_user(user_create)
                 print(f"✅ Created default user: {user_data['username']}")
             except ValueError as e:
                 print(f"⚠️ User {user_data['username']} already exists or error: {e}")
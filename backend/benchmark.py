@@ -0,0 +1,517 @@
+"""
+Benchmarks for the FMECA analysis pipeline.
+
+Run from the backend folder:
+
+    python benchmark.py coverage-join --sizes 1000 10000 100000
+    python benchmark.py atm-check --sizes 1000 10000 100000
+    python benchmark.py storage-format --rows 5000
+    python benchmark.py sheet-discovery --rows 5000 --extra-sheets 4
+    python benchmark.py tokenizer --rows 100000
+    python benchmark.py compression --rows 5000 --link-mbps 2
+    python benchmark.py serialization --rows 10000
+    python benchmark.py incremental --rows 20000
+    python benchmark.py row-diff --rows 20000 --edits 200
+"""
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import zlib
+from typing import List
+
+import bson
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+
+from analysis import (
+    build_designator_index, check_missing_designators, detect_column_roles, fmeca_columns_from_frame,
+    fmeca_rows_from_frame, join_coverage, role_columns, FMECA_ROW_KEYS
+)
+from compression import brotli
+from responses import json_bytes
+from ingest import (
+    build_row_index, dataframe_to_stored_data, diff_row_indexes, parse_excel_upload,
+    stored_data_to_dataframe, SHEET_NAMES
+)
+from matching import (
+    extract_designators, extract_complete_designators, extract_designators_batch, extract_complete_designators_batch,
+    match_atm_coverage, find_missing_designators
+)
+from tests.designators import (
+    legacy_atm_check, legacy_coverage_join, make_synthetic_board, reference_extract_designators,
+    reference_extract_complete_designators
+)
+
+# ==================== COVERAGE JOIN ====================
+
+def indexed_coverage_join(designators: pd.Series, ref_df: pd.DataFrame) -> list:
+    return match_atm_coverage(
+        designators.astype(str).str.upper(),
+        ref_df["CRD"].astype(str).str.upper(),
+        ref_df["Result"]
+    )
+
+def bench_coverage_join(sizes, legacy_max_rows: int):
+    print(f"{'rows':>8} {'legacy (s)':>12} {'indexed (s)':>12} {'speedup':>9}")
+    for rows in sizes:
+        fmeca_df, ref_df = make_synthetic_board(rows)
+        designators = fmeca_df["Reference Designator"]
+
+        start = time.perf_counter()
+        indexed = indexed_coverage_join(designators, ref_df)
+        indexed_time = time.perf_counter() - start
+
+        if rows > legacy_max_rows:
+            print(f"{rows:>8} {'skipped':>12} {indexed_time:>12.3f} {'-':>9}")
+            continue
+
+        start = time.perf_counter()
+        legacy = legacy_coverage_join(designators, ref_df)
+        legacy_time = time.perf_counter() - start
+
+        if legacy != indexed:
+            raise AssertionError(f"Coverage join mismatch on {rows} rows")
+
+        print(f"{rows:>8} {legacy_time:>12.3f} {indexed_time:>12.3f} {legacy_time / indexed_time:>8.1f}x")
+
+# ==================== ATM CHECK ====================
+
+def bench_atm_check(sizes, legacy_max_rows: int):
+    print(f"{'rows':>8} {'legacy (s)':>12} {'indexed (s)':>12} {'speedup':>9}")
+    for rows in sizes:
+        fmeca_df, ref_df = make_synthetic_board(rows)
+        designators = fmeca_df["Reference Designator"]
+
+        start = time.perf_counter()
+        indexed = find_missing_designators(designators, ref_df["CRD"], ref_df["Result"])
+        indexed_time = time.perf_counter() - start
+
+        if rows > legacy_max_rows:
+            print(f"{rows:>8} {'skipped':>12} {indexed_time:>12.3f} {'-':>9}")
+            continue
+
+        start = time.perf_counter()
+        legacy = legacy_atm_check(designators, ref_df)
+        legacy_time = time.perf_counter() - start
+
+        if legacy != indexed:
+            raise AssertionError(f"ATM check mismatch on {rows} rows")
+
+        print(f"{rows:>8} {legacy_time:>12.3f} {indexed_time:>12.3f} {legacy_time / indexed_time:>8.1f}x")
+
+# ==================== STORAGE FORMAT ====================
+
+FMECA_TEXT_COLUMNS = [
+    "Function", "Failure Mode", "Local Effect", "Next Level Effect", "End Effect",
+    "Failure Cause", "Detection Method", "Compensating Provision", "Remarks"
+]
+FMECA_SCORE_COLUMNS = ["Severity", "Occurrence", "Detection", "Failure Rate (FIT)"]
+
+def make_wide_fmeca_sheet(rows: int, seed: int = 0) -> pd.DataFrame:
+    """A synthetic FMECA sheet with the width of a typical DFMECA export"""
+    fmeca_df, _ = make_synthetic_board(rows, seed)
+    rng = random.Random(seed)
+    for column in FMECA_TEXT_COLUMNS:
+        fmeca_df[column] = [f"{column} text {rng.randint(1, 400)}" for _ in range(rows)]
+    for column in FMECA_SCORE_COLUMNS:
+        fmeca_df[column] = [rng.randint(1, 10) for _ in range(rows)]
+    return fmeca_df
+
+def legacy_stored_data(df: pd.DataFrame) -> dict:
+    """The original record-per-row layout (storage format 1)"""
+    return {
+        "columns": df.columns.tolist(),
+        "data": df.replace({pd.NaT: None, np.nan: None}).to_dict(orient='records'),
+        "dtypes": {col: str(df[col].dtype) for col in df.columns},
+        "shape": df.shape
+    }
+
+def bench_storage_format(rows: int, repeat: int):
+    df = make_wide_fmeca_sheet(rows)
+    analysis_columns = role_columns(detect_column_roles(df, "fmeca"))
+    print(f"Sheet: {rows} rows x {df.shape[1]} columns ({len(analysis_columns)} used by the analysis)")
+    print(f"{'format':<10} {'BSON KB':>10} {'load (ms)':>10}")
+
+    results = {}
+    for name, data_dict in [
+        ("records", legacy_stored_data(df)),
+        ("columnar", dataframe_to_stored_data(df)),
+        ("projected", dataframe_to_stored_data(df[analysis_columns]))
+    ]:
+        encoded = bson.encode({"data": data_dict})
+
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            stored_data_to_dataframe(bson.decode(encoded)["data"])
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+
+        results[name] = (len(encoded), best)
+        print(f"{name:<10} {len(encoded) / 1024:>10.1f} {best * 1000:>10.1f}")
+
+    (old_size, old_time), (new_size, new_time) = results["records"], results["columnar"]
+    print(f"Columnar: {100 * (1 - new_size / old_size):.1f}% smaller, {old_time / new_time:.1f}x faster to load")
+    projected_size, projected_time = results["projected"]
+    print(f"Projected: {100 * (1 - projected_size / new_size):.1f}% smaller, "
+          f"{new_time / projected_time:.1f}x faster to load than all columns")
+
+# ==================== SHEET DISCOVERY ====================
+
+def legacy_parse_excel(contents: bytes, file_type: str) -> pd.DataFrame:
+    """The original upload parsing: try read_excel on each sheet name in turn"""
+    excel_bytes = io.BytesIO(contents)
+
+    df = None
+    for sheet in SHEET_NAMES[file_type]:
+        try:
+            df = pd.read_excel(excel_bytes, sheet_name=sheet)
+            break
+        except Exception:
+            continue
+
+    if df is None:
+        excel_bytes.seek(0)
+        df = pd.read_excel(excel_bytes)
+
+    return df.ffill()
+
+def make_multi_sheet_workbook(path: str, target_sheet: str, rows: int, extra_sheets: int):
+    """A coverage workbook whose data sheet sits among other populated sheets"""
+    _, coverage_df = make_synthetic_board(rows)
+    with pd.ExcelWriter(path) as writer:
+        for index in range(extra_sheets):
+            filler_df, _ = make_synthetic_board(rows, seed=index + 1)
+            filler_df.to_excel(writer, sheet_name=f"Revision {index + 1}", index=False)
+        coverage_df.to_excel(writer, sheet_name=target_sheet, index=False)
+
+def bench_sheet_discovery(rows: int, extra_sheets: int, repeat: int):
+    # Best case hits the first sheet name tried; "ATM" is the last; "Board" matches none
+    scenarios = [SHEET_NAMES["coverage"][0], SHEET_NAMES["coverage"][-1], "Board"]
+    print(f"Coverage workbooks: {rows} rows per sheet, {extra_sheets} extra sheets")
+    print(f"{'data sheet':<12} {'legacy (s)':>11} {'single (s)':>11} {'speedup':>8}")
+
+    for target_sheet in scenarios:
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "coverage.xlsx")
+            make_multi_sheet_workbook(path, target_sheet, rows, extra_sheets)
+            with open(path, "rb") as workbook_file:
+                contents = workbook_file.read()
+
+            legacy_best = single_best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                legacy_df = legacy_parse_excel(contents, "coverage")
+                elapsed = time.perf_counter() - start
+                legacy_best = elapsed if legacy_best is None else min(legacy_best, elapsed)
+
+                start = time.perf_counter()
+                data = parse_excel_upload(path, "coverage")["data"]
+                elapsed = time.perf_counter() - start
+                single_best = elapsed if single_best is None else min(single_best, elapsed)
+
+            assert stored_data_to_dataframe(data).equals(legacy_df), f"sheet mismatch for {target_sheet}"
+            print(f"{target_sheet:<12} {legacy_best:>11.3f} {single_best:>11.3f} "
+                  f"{legacy_best / single_best:>7.1f}x")
+
+# ==================== TOKENIZER ====================
+
+def bench_tokenizer(rows: int, repeat: int):
+    fmeca_df, coverage_df = make_synthetic_board(rows)
+    # Forward-filled sheets repeat cells; emulate merged cells spanning several rows
+    designator_values = fmeca_df["Reference Designator"].iloc[[index - index % 3 for index in range(rows)]].tolist()
+    crd_values = coverage_df["CRD"].tolist()
+
+    print(f"{rows} rows per column")
+    print(f"{'column':<22} {'original (s)':>13} {'compiled (s)':>13} {'batch (s)':>10}")
+    columns = [
+        ("Reference Designator", designator_values, reference_extract_designators,
+         extract_designators, extract_designators_batch),
+        ("CRD", crd_values, reference_extract_complete_designators,
+         extract_complete_designators, extract_complete_designators_batch),
+    ]
+    for name, values, reference, single, batch in columns:
+        timings = []
+        for run in [
+            lambda: [reference(value) for value in values],
+            lambda: [single(value) for value in values],
+            lambda: batch(values),
+        ]:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings.append(best)
+        print(f"{name:<22} {timings[0]:>13.3f} {timings[1]:>13.3f} {timings[2]:>10.3f}")
+
+# ==================== RESPONSE COMPRESSION ====================
+
+def bench_compression(rows: int, link_mbps: float, gzip_level: int, brotli_quality: int, repeat: int):
+    fmeca_df, coverage_df = make_synthetic_board(rows)
+    joined, _ = join_coverage(fmeca_df, coverage_df)
+    bodies = {
+        "rows": {"data": fmeca_rows_from_frame(joined), "count": len(joined)},
+        "columnar": {"data": fmeca_columns_from_frame(joined), "count": len(joined)}
+    }
+
+    encoders = [("identity", lambda body: body), ("gzip", lambda body: gzip_encode(body, gzip_level))]
+    if brotli is not None:
+        encoders.append(("br", lambda body: brotli.compress(body, quality=brotli_quality)))
+    else:
+        print("⚠️ brotli is not installed, skipping br")
+
+    print(f"/fmeca-data body for {rows} rows, {link_mbps} Mbit/s link (end-to-end = encode + transfer)")
+    print(f"{'shape':<9} {'encoding':<9} {'wire KB':>9} {'encode (ms)':>12} {'transfer (ms)':>14} {'end-to-end (ms)':>16}")
+
+    baseline = None
+    for shape, payload in bodies.items():
+        for name, encode in encoders:
+            best = None
+            for _ in range(repeat):
+                start = time.perf_counter()
+                wire = encode(json.dumps(payload).encode())
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+
+            transfer = len(wire) * 8 / (link_mbps * 1_000_000)
+            total = best + transfer
+            baseline = baseline or total
+            print(f"{shape:<9} {name:<9} {len(wire) / 1024:>9.1f} {best * 1000:>12.1f} "
+                  f"{transfer * 1000:>14.1f} {total * 1000:>16.1f}  ({baseline / total:.1f}x)")
+
+def gzip_encode(body: bytes, level: int) -> bytes:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(body) + compressor.flush()
+
+# ==================== JSON SERIALIZATION ====================
+
+class LegacyMissingComponent(BaseModel):
+    component: str
+    atm_coverage: str
+
+class LegacyATMResponse(BaseModel):
+    missing_components: List[LegacyMissingComponent]
+    message: str
+
+def bench_serialization(rows: int, repeat: int):
+    fmeca_df, coverage_df = make_synthetic_board(rows)
+    joined, _ = join_coverage(fmeca_df, coverage_df)
+    fmeca_rows = fmeca_rows_from_frame(joined)
+    missing = check_missing_designators(fmeca_df, coverage_df)
+
+    def legacy_atm():
+        response = LegacyATMResponse(
+            missing_components=[
+                LegacyMissingComponent(component=designator, atm_coverage=result) for designator, result in missing
+            ],
+            message=""
+        )
+        return json.dumps(jsonable_encoder(response)).encode()
+
+    def atm():
+        return json_bytes({
+            "missing_components": [
+                {"component": designator, "atm_coverage": result} for designator, result in missing
+            ],
+            "message": ""
+        })
+
+    cases = [
+        ("/fmeca-data", "jsonable_encoder + json", lambda: json.dumps(jsonable_encoder({"data": fmeca_rows})).encode()),
+        ("/fmeca-data", "orjson, cached rows", lambda: json_bytes({"data": fmeca_rows})),
+        ("/fmeca-data", "frame -> rows -> orjson", lambda: json_bytes({"data": fmeca_rows_from_frame(joined)})),
+        ("/fmeca-data", "frame -> columnar -> orjson", lambda: json_bytes({"data": fmeca_columns_from_frame(joined)})),
+        ("/fmeca-data", "frame -> pandas to_json", lambda: joined.iloc[:, :len(FMECA_ROW_KEYS)].astype(str)
+            .set_axis(list(FMECA_ROW_KEYS), axis=1).to_json(orient="records").encode()),
+        ("/atm-check", "pydantic + jsonable_encoder", legacy_atm),
+        ("/atm-check", "dicts + orjson", atm),
+    ]
+
+    print(f"{rows} FMECA rows, {len(missing)} missing designators; times per 10k rows/designators")
+    print(f"{'endpoint':<12} {'path':<30} {'KB':>8} {'ms / 10k':>10}")
+    for endpoint, name, run in cases:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            body = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        count = rows if endpoint == "/fmeca-data" else max(1, len(missing))
+        print(f"{endpoint:<12} {name:<30} {len(body) / 1024:>8.1f} {best * 1000 * 10000 / count:>10.1f}")
+
+# ==================== INCREMENTAL RE-ANALYSIS ====================
+
+def bench_incremental(rows: int, repeat: int):
+    fmeca_df, coverage_df = make_synthetic_board(rows)
+    fmeca_roles = detect_column_roles(fmeca_df, "fmeca")
+    coverage_roles = detect_column_roles(coverage_df, "coverage")
+    fmeca_index = build_designator_index(fmeca_df, "fmeca", fmeca_roles)
+    coverage_index = build_designator_index(coverage_df, "coverage", coverage_roles)
+    joined, _ = join_coverage(fmeca_df, coverage_df, fmeca_roles, coverage_roles, coverage_index)
+    atm_coverage = joined["ATM Coverage"].reindex(fmeca_df.index).tolist()
+
+    def analyze(fmeca, stored=None):
+        join_coverage(fmeca_df, coverage_df, fmeca_roles, coverage_roles, coverage_index, fmeca, stored)
+        if stored is None:
+            check_missing_designators(fmeca_df, coverage_df, fmeca_roles, coverage_roles, fmeca, coverage_index)
+
+    runs = [
+        ("FMECA index rebuilt too", lambda: analyze(build_designator_index(fmeca_df, "fmeca", fmeca_roles))),
+        ("stored FMECA, no match keys", lambda: analyze({key: value for key, value in fmeca_index.items()
+                                                         if not key.startswith("match_")})),
+        ("stored FMECA index", lambda: analyze(fmeca_index)),
+        ("stored pair results", lambda: analyze(fmeca_index, atm_coverage)),
+    ]
+
+    print(f"New coverage version against an unchanged {rows}-row FMECA (coverage index built at upload)")
+    print(f"{'FMECA side':<30} {'join + ATM check (s)':>21}")
+    for name, run in runs:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:<30} {best:>21.3f}")
+
+# ==================== ROW DIFF ====================
+
+def edit_sheet(df: pd.DataFrame, edits: int, seed: int = 0) -> pd.DataFrame:
+    """A next version of a sheet: edits rows changed, edits // 2 removed and edits // 2 added"""
+    rng = random.Random(seed)
+    edited = df.copy()
+    for position in rng.sample(range(len(df)), edits):
+        edited.iloc[position, edited.columns.get_loc("Component")] = f"Edited {position}"
+    edited = edited.drop(index=rng.sample(range(len(df)), edits // 2))
+    added = df.sample(n=edits // 2, random_state=seed).copy()
+    added["ID"] = [f"NEW-{position}" for position in range(len(added))]
+    return pd.concat([edited, added], ignore_index=True)
+
+def reference_row_diff(old_df: pd.DataFrame, new_df: pd.DataFrame) -> dict:
+    """Diff two versions with unique IDs by comparing the full sheets"""
+    old_rows = {row[0]: (position, row) for position, row in enumerate(old_df.itertuples(index=False))}
+    new_rows = {row[0]: (position, row) for position, row in enumerate(new_df.itertuples(index=False))}
+    return {
+        "added": sorted(new_rows[key][0] for key in new_rows.keys() - old_rows.keys()),
+        "removed": sorted(old_rows[key][0] for key in old_rows.keys() - new_rows.keys()),
+        "changed": sorted(([old_rows[key][0], new_rows[key][0]] for key in new_rows.keys() & old_rows.keys()
+                           if tuple(old_rows[key][1]) != tuple(new_rows[key][1])), key=lambda pair: pair[1])
+    }
+
+def bench_row_diff(rows: int, edits: int, repeat: int):
+    old_df = make_wide_fmeca_sheet(rows)
+    new_df = edit_sheet(old_df, edits)
+    old_data, new_data = dataframe_to_stored_data(old_df), dataframe_to_stored_data(new_df)
+    old_index, new_index = build_row_index(old_data, "ID"), build_row_index(new_data, "ID")
+
+    diff = diff_row_indexes(old_index, new_index)
+    expected = reference_row_diff(old_df, new_df)
+    assert all(diff[kind] == expected[kind] for kind in expected), "row index diff differs from the full comparison"
+    print(f"✅ row diff: {len(diff['added'])} added, {len(diff['removed'])} removed, "
+          f"{len(diff['changed'])} changed rows match the full sheet comparison")
+
+    sheet_bytes = len(bson.encode({"data": new_data}))
+    index_bytes = len(bson.encode(new_index))
+    diff_bytes = len(bson.encode(diff))
+    print(f"{rows}-row sheet: {sheet_bytes / 1024:.1f} KB, row index {index_bytes / 1024:.1f} KB, "
+          f"stored diff {diff_bytes / 1024:.1f} KB")
+
+    runs = [
+        ("build row index (upload)", lambda: build_row_index(new_data, "ID")),
+        ("diff of row indexes", lambda: diff_row_indexes(old_index, new_index)),
+        ("full sheet comparison", lambda: reference_row_diff(old_df, new_df)),
+    ]
+    print(f"{'step':<26} {'time (ms)':>10}")
+    for name, run in runs:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        print(f"{name:<26} {best * 1000:>10.1f}")
+
+# ==================== ENTRY POINT ====================
+
+def main():
+    parser = argparse.ArgumentParser(description="FMECA analysis benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    coverage_parser = subparsers.add_parser("coverage-join", help="Legacy loop vs indexed coverage join")
+    coverage_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    coverage_parser.add_argument(
+        "--legacy-max-rows", type=int, default=10000,
+        help="Skip the legacy loop above this size (it is quadratic)"
+    )
+
+    atm_parser = subparsers.add_parser("atm-check", help="Legacy loop vs indexed missing designator check")
+    atm_parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    atm_parser.add_argument(
+        "--legacy-max-rows", type=int, default=1000,
+        help="Skip the legacy loop above this size (it is quadratic)"
+    )
+
+    storage_parser = subparsers.add_parser("storage-format", help="Record vs columnar stored sheet size and load time")
+    storage_parser.add_argument("--rows", type=int, default=5000)
+    storage_parser.add_argument("--repeat", type=int, default=5)
+
+    sheet_parser = subparsers.add_parser("sheet-discovery", help="Trial read_excel calls vs one workbook open")
+    sheet_parser.add_argument("--rows", type=int, default=5000)
+    sheet_parser.add_argument("--extra-sheets", type=int, default=4)
+    sheet_parser.add_argument("--repeat", type=int, default=3)
+
+    tokenizer_parser = subparsers.add_parser("tokenizer", help="Designator tokenizer timings against the originals")
+    tokenizer_parser.add_argument("--rows", type=int, default=100000)
+    tokenizer_parser.add_argument("--repeat", type=int, default=3)
+
+    compression_parser = subparsers.add_parser("compression", help="Response size and time per encoding and shape")
+    compression_parser.add_argument("--rows", type=int, default=5000)
+    compression_parser.add_argument("--link-mbps", type=float, default=2.0, help="Client link speed")
+    compression_parser.add_argument("--gzip-level", type=int, default=6)
+    compression_parser.add_argument("--brotli-quality", type=int, default=5)
+    compression_parser.add_argument("--repeat", type=int, default=3)
+
+    serialization_parser = subparsers.add_parser("serialization", help="JSON serialization time per 10k rows")
+    serialization_parser.add_argument("--rows", type=int, default=10000)
+    serialization_parser.add_argument("--repeat", type=int, default=5)
+
+    incremental_parser = subparsers.add_parser("incremental", help="Analysis of a new coverage version per reused artifact")
+    incremental_parser.add_argument("--rows", type=int, default=20000)
+    incremental_parser.add_argument("--repeat", type=int, default=3)
+
+    row_diff_parser = subparsers.add_parser("row-diff", help="Row index diff check, sizes and timings")
+    row_diff_parser.add_argument("--rows", type=int, default=20000)
+    row_diff_parser.add_argument("--edits", type=int, default=200, help="Rows changed (half as many removed and added)")
+    row_diff_parser.add_argument("--repeat", type=int, default=3)
+
+    args = parser.parse_args()
+
+    if args.benchmark == "coverage-join":
+        bench_coverage_join(args.sizes, args.legacy_max_rows)
+    elif args.benchmark == "atm-check":
+        bench_atm_check(args.sizes, args.legacy_max_rows)
+    elif args.benchmark == "storage-format":
+        bench_storage_format(args.rows, args.repeat)
+    elif args.benchmark == "sheet-discovery":
+        bench_sheet_discovery(args.rows, args.extra_sheets, args.repeat)
+    elif args.benchmark == "tokenizer":
+        bench_tokenizer(args.rows, args.repeat)
+    elif args.benchmark == "compression":
+        bench_compression(args.rows, args.link_mbps, args.gzip_level, args.brotli_quality, args.repeat)
+    elif args.benchmark == "serialization":
+        bench_serialization(args.rows, args.repeat)
+    elif args.benchmark == "incremental":
+        bench_incremental(args.rows, args.repeat)
+    elif args.benchmark == "row-diff":
+        bench_row_diff(args.rows, args.edits, args.repeat)
+
+if __name__ == "__main__":
+    main()
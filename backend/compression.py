@@ -0,0 +1,149 @@
+import zlib
+from typing import List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+
+def supported_encodings(encodings: List[str]) -> List[str]:
+    """The configured encodings this process can produce, in preference order"""
+    return [encoding for encoding in encodings if encoding == "gzip" or (encoding == "br" and brotli is not None)]
+
+def negotiate_encoding(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """First of encodings (server preference order) the Accept-Encoding header allows"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        quality = 1.0
+        params = params.strip().replace(" ", "")
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+
+    for encoding in encodings:
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > 0:
+            return encoding
+    return None
+
+
+class CompressionMiddleware:
+    """
+    Compress response bodies of at least minimum_size bytes with brotli or
+    gzip, whichever the client accepts first in the configured order.
+    Streamed bodies are compressed and flushed message by message, so
+    NDJSON rows still reach the client as they are produced. The ETag of
+    a compressed response is made weak, as it no longer names the exact
+    bytes sent.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        encodings: List[str],
+        minimum_size: int = 1024,
+        gzip_level: int = 6,
+        brotli_quality: int = 5
+    ):
+        self.app = app
+        self.encodings = supported_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and self.encodings:
+            encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+            if encoding is not None:
+                responder = CompressionResponder(self.app, encoding, self)
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class CompressionResponder:
+    def __init__(self, app: ASGIApp, encoding: str, middleware: CompressionMiddleware):
+        self.app = app
+        self.encoding = encoding
+        self.minimum_size = middleware.minimum_size
+        if encoding == "br":
+            self.compressor = brotli.Compressor(quality=middleware.brotli_quality)
+        else:
+            self.compressor = zlib.compressobj(middleware.gzip_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self.send = None
+        self.initial_message = None
+        self.passthrough = False
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def compress(self, body: bytes, finish: bool) -> bytes:
+        if self.encoding == "br":
+            data = self.compressor.process(body)
+            return data + (self.compressor.finish() if finish else self.compressor.flush())
+        data = self.compressor.compress(body)
+        return data + self.compressor.flush(zlib.Z_FINISH if finish else zlib.Z_SYNC_FLUSH)
+
+    def set_encoding_headers(self, content_length: Optional[int]):
+        headers = MutableHeaders(raw=self.initial_message["headers"])
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        if content_length is None:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(content_length)
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def send_compressed(self, message: Message):
+        if message["type"] == "http.response.start":
+            # Held back until the first body message tells whether to compress
+            self.initial_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = "content-encoding" in headers or message["status"] in (204, 304)
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        if self.passthrough:
+            if not self.started:
+                self.started = True
+                await self.send(self.initial_message)
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if len(body) < self.minimum_size and not more_body:
+                MutableHeaders(raw=self.initial_message["headers"]).add_vary_header("Accept-Encoding")
+                await self.send(self.initial_message)
+                await self.send(message)
+                return
+
+            compressed = self.compress(body, finish=not more_body)
+            self.set_encoding_headers(None if more_body else len(compressed))
+            await self.send(self.initial_message)
+            await self.send({"type": "http.response.body", "body": compressed, "more_body": more_body})
+            return
+
+        await self.send({
+            "type": "http.response.body",
+            "body": self.compress(body, finish=not more_body),
+            "more_body": more_body
+        })
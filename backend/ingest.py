@@ -0,0 +1,282 @@
+import hashlib
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import bson
+import numpy as np
+import orjson
+import pandas as pd
+
+from analysis import build_designator_index, detect_column_roles, role_columns
+
+# Layout of the "data" field of excel_files documents:
+#   1 - {"columns", "data": [row dicts], "dtypes", "shape"} (or a bare list of row dicts)
+#   2 - {"columns", "arrays": [one value list per column], "dtypes", "shape"}
+#   3 - {"columns", "dtypes", "shape", "chunk_count"}, the arrays split by rows
+#       into excel_chunks documents {"file_id", "seq", "row_start", "arrays"}
+STORAGE_FORMAT_VERSION = 3
+
+# Target BSON size of one chunk document (MongoDB rejects documents over 16 MB)
+EXCEL_CHUNK_BYTES = int(os.getenv("EXCEL_CHUNK_BYTES", str(4 * 1024 * 1024)))
+CHUNK_SIZE_SAMPLE_ROWS = 200
+
+# Sheet names tried in order for each file type
+SHEET_NAMES = {
+    "fmeca": ['DFMECA', 'Sheet1', 'FMECA', 'Data'],
+    "coverage": ['iiGD board', 'Sheet1', 'Coverage', 'Data', 'ATM']
+}
+
+def choose_sheet(sheet_names: List[str], file_type: str) -> str:
+    """Pick the sheet to load: the first SHEET_NAMES entry present, else the first sheet"""
+    for sheet in SHEET_NAMES[file_type]:
+        if sheet in sheet_names:
+            return sheet
+    return sheet_names[0]
+
+def parse_excel_upload(path: str, file_type: str) -> dict:
+    """
+    Parse an uploaded workbook (spooled to disk) into what is stored in
+    MongoDB: {"data", "sheet_name", "column_roles", "designator_index",
+    "row_index", "data_hash"}.
+    """
+    # One read-only open of the workbook; only the chosen sheet is parsed
+    with pd.ExcelFile(path) as workbook:
+        sheet = choose_sheet(workbook.sheet_names, file_type)
+        df = workbook.parse(sheet)
+    print(f"✅ Loaded from sheet: {sheet}")
+
+    # Fill NaN values
+    df = df.ffill()
+
+    data = dataframe_to_stored_data(df)
+    roles = detect_column_roles(df, file_type)
+
+    # Index the role columns as analysis will load them back from storage
+    analysis_df = stored_data_to_dataframe(select_stored_columns(data, role_columns(roles)))
+    row_index = build_row_index(data, diff_key_column(roles, file_type))
+
+    return {
+        "data": data,
+        "sheet_name": sheet,
+        "column_roles": roles,
+        "designator_index": build_designator_index(analysis_df, file_type, roles),
+        "row_index": row_index,
+        "data_hash": stored_data_hash(sheet, data, row_index)
+    }
+
+# ==================== STORAGE FORMAT ====================
+
+def dataframe_to_stored_data(df: pd.DataFrame) -> dict:
+    """Convert a DataFrame to the column-oriented stored layout (format 2)"""
+    clean_df = df.replace({pd.NaT: None, np.nan: None})
+    return {
+        "columns": df.columns.tolist(),
+        "arrays": [clean_df.iloc[:, position].tolist() for position in range(clean_df.shape[1])],
+        "dtypes": {col: str(df[col].dtype) for col in df.columns},
+        "shape": df.shape
+    }
+
+def select_stored_columns(data: dict, columns: List) -> dict:
+    """Narrow a format 2 "data" field to the given columns"""
+    positions = [data["columns"].index(column) for column in columns]
+    return {
+        "columns": list(columns),
+        "arrays": [data["arrays"][position] for position in positions],
+        "dtypes": {column: data["dtypes"].get(column) for column in columns},
+        "shape": [data["shape"][0], len(columns)]
+    }
+
+def detect_storage_format(data: Any) -> int:
+    """Tell which layout a stored "data" field uses"""
+    if isinstance(data, dict) and "chunk_count" in data:
+        return 3
+    if isinstance(data, dict) and "arrays" in data:
+        return 2
+    return 1
+
+def rows_per_chunk(data: dict) -> int:
+    """Number of rows of a format 2 "data" field that fit in about EXCEL_CHUNK_BYTES"""
+    # Estimate the encoded size of a row from a sample of leading rows
+    sample_rows = min(data["shape"][0], CHUNK_SIZE_SAMPLE_ROWS)
+    if not sample_rows:
+        return 1
+    sample_bytes = len(bson.encode({"arrays": [values[:sample_rows] for values in data["arrays"]]}))
+    return max(1, int(EXCEL_CHUNK_BYTES * sample_rows / sample_bytes))
+
+def chunked_metadata(data: dict, chunk_rows: int) -> dict:
+    """The format 3 "data" field of a format 2 one split into chunk_rows-row chunks"""
+    return {
+        "columns": data["columns"],
+        "dtypes": data["dtypes"],
+        "shape": data["shape"],
+        "chunk_count": -(-data["shape"][0] // chunk_rows)
+    }
+
+def iter_stored_chunks(data: dict, chunk_rows: int) -> Iterator[dict]:
+    """Yield the row chunks of a format 2 "data" field one at a time"""
+    for seq, row_start in enumerate(range(0, data["shape"][0], chunk_rows)):
+        yield {
+            "seq": seq,
+            "row_start": row_start,
+            "arrays": [values[row_start:row_start + chunk_rows] for values in data["arrays"]]
+        }
+
+def split_stored_data(data: dict) -> Tuple[dict, List[dict]]:
+    """Split a format 2 "data" field into format 3 metadata and its list of row chunks"""
+    chunk_rows = rows_per_chunk(data)
+    return chunked_metadata(data, chunk_rows), list(iter_stored_chunks(data, chunk_rows))
+
+def stored_data_to_dataframe(data: Any) -> pd.DataFrame:
+    """Rebuild a DataFrame from a stored "data" field (chunked data must be assembled first)"""
+    storage_format = detect_storage_format(data)
+    if storage_format == 3:
+        raise ValueError("Chunked sheet data must be assembled with storage.load_stored_data")
+    if storage_format == 2:
+        columns = data["columns"]
+        return pd.DataFrame(
+            {position: values for position, values in enumerate(data["arrays"])},
+            index=pd.RangeIndex(data["shape"][0]) if columns else None
+        ).set_axis(columns, axis=1)
+
+    if isinstance(data, dict) and "data" in data and "columns" in data:
+        return pd.DataFrame(data["data"], columns=data["columns"])
+    return pd.DataFrame(data)
+
+def stored_data_to_records(data: Any) -> dict:
+    """Present a stored (or assembled) "data" field in the legacy record layout"""
+    if detect_storage_format(data) == 1:
+        return data
+
+    df = stored_data_to_dataframe(data)
+    return {
+        "columns": data["columns"],
+        "data": df.replace({pd.NaT: None, np.nan: None}).to_dict(orient='records'),
+        "dtypes": data["dtypes"],
+        "shape": data["shape"]
+    }
+
+def stored_column_names(data: Any) -> list:
+    """Column names of a stored "data" field of any layout"""
+    if isinstance(data, dict) and "columns" in data:
+        return data["columns"]
+    return list(data[0].keys()) if data else []
+
+def stored_row_count(data: Any) -> int:
+    if isinstance(data, dict) and "shape" in data:
+        return data["shape"][0]
+    if isinstance(data, dict) and "data" in data:
+        return len(data["data"])
+    return len(data)
+
+# ==================== ROW DIFF ====================
+
+# Bumped when row hashes or keys change meaning; indexes of another version are rebuilt
+ROW_INDEX_VERSION = 2
+ROW_HASH_BYTES = 8
+
+def diff_key_column(roles: Dict[str, Any], file_type: str) -> Optional[Any]:
+    """Column identifying a row across versions: the FMECA ID or the coverage CRD"""
+    return roles.get("id") if file_type == "fmeca" else roles.get("crd")
+
+def hashed_cell(value: Any) -> Any:
+    """A cell as hashed: parsed Timestamps and datetimes read back from MongoDB hash alike"""
+    if isinstance(value, datetime):
+        if isinstance(value, pd.Timestamp):
+            value = value.to_pydatetime(warn=False)
+        # MongoDB keeps millisecond precision
+        return value.replace(microsecond=value.microsecond - value.microsecond % 1000).isoformat()
+    return value
+
+def row_hash(columns: List[str], row: tuple) -> bytes:
+    # Cells are hashed by column name, so reordering columns changes no row
+    cells = sorted(zip(columns, row), key=lambda cell: cell[0])
+    return hashlib.blake2b(orjson.dumps(cells, default=str), digest_size=ROW_HASH_BYTES).digest()
+
+def build_row_index(data: dict, key_column: Optional[Any] = None) -> dict:
+    """
+    Hash every row of a format 2 "data" field for diffing against other
+    versions: {"key_column", "keys" (key cell text per row, None without
+    a key column), "hashes" (ROW_HASH_BYTES per row, concatenated),
+    "index_version"}.
+    """
+    columns = [str(column) for column in data["columns"]]
+    # Only datetime and object columns can hold datetimes
+    arrays = [
+        values if str(data["dtypes"].get(column)).startswith(("int", "float", "bool"))
+        else [hashed_cell(value) for value in values]
+        for column, values in zip(data["columns"], data["arrays"])
+    ]
+    hashes = b"".join(row_hash(columns, row) for row in zip(*arrays))
+
+    keys = None
+    if key_column is not None and key_column in data["columns"]:
+        key_values = data["arrays"][data["columns"].index(key_column)]
+        keys = ["" if value is None else str(value) for value in key_values]
+
+    return {
+        "key_column": key_column if keys is not None else None,
+        "keys": keys,
+        "hashes": hashes,
+        "index_version": ROW_INDEX_VERSION
+    }
+
+def stored_data_hash(sheet_name: str, data: dict, row_index: dict) -> str:
+    """Hash of a parsed sheet, equal for uploads that would store the same data"""
+    header = orjson.dumps([
+        sheet_name,
+        [str(column) for column in data["columns"]],
+        [data["dtypes"].get(column) for column in data["columns"]],
+        row_index["key_column"]
+    ], default=str)
+    return hashlib.sha256(header + row_index["hashes"]).hexdigest()
+
+def _row_digests(row_index: dict) -> List[bytes]:
+    hashes = row_index["hashes"]
+    return [hashes[offset:offset + ROW_HASH_BYTES] for offset in range(0, len(hashes), ROW_HASH_BYTES)]
+
+def diff_row_indexes(old_index: dict, new_index: dict) -> dict:
+    """
+    Compare the row indexes of two versions of a sheet. Rows are matched
+    by key (rows sharing a key first by content, then in order) when both
+    have a key column, else by content only. Returns {"added": [new row],
+    "removed": [old row], "changed": [[old row, new row]], "unchanged"}.
+    """
+    keyed = old_index.get("keys") is not None and new_index.get("keys") is not None
+    old_rows = _row_digests(old_index)
+    new_rows = _row_digests(new_index)
+    if keyed:
+        old_rows = list(zip(old_index["keys"], old_rows))
+        new_rows = list(zip(new_index["keys"], new_rows))
+
+    # Identical rows (same key and content) first
+    old_positions = {}
+    for position, row in enumerate(old_rows):
+        old_positions.setdefault(row, []).append(position)
+    new_left = []
+    for position, row in enumerate(new_rows):
+        matches = old_positions.get(row)
+        if matches:
+            matches.pop(0)
+        else:
+            new_left.append(position)
+    old_left = sorted(position for positions in old_positions.values() for position in positions)
+    unchanged = len(new_rows) - len(new_left)
+
+    if not keyed:
+        return {"added": new_left, "removed": old_left, "changed": [], "unchanged": unchanged}
+
+    # Rows left under the same key are edits of each other, paired in order
+    old_by_key = {}
+    for position in old_left:
+        old_by_key.setdefault(old_rows[position][0], []).append(position)
+    added, changed = [], []
+    for position in new_left:
+        matches = old_by_key.get(new_rows[position][0])
+        if matches:
+            changed.append([matches.pop(0), position])
+        else:
+            added.append(position)
+    removed = sorted(position for positions in old_by_key.values() for position in positions)
+
+    return {"added": added, "removed": removed, "changed": changed, "unchanged": unchanged}
@@ -0,0 +1,251 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+from auth import db
+from workers import CPU_BUSY_DETAIL
+
+# Background jobs (uploads), persisted so queued and interrupted jobs survive a restart
+upload_jobs_collection = db.upload_jobs
+
+# Job runner configuration (each runner handles one job at a time; CPU work still goes to the worker pool)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "2"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "10"))
+# A running job whose runner stopped sending heartbeats (process killed) is run again
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "60"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+# Finished jobs are removed by a TTL index after this long
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+FINISHED_STATUSES = ("done", "failed")
+
+# kind -> (run(job, progress) -> result, finish(job) called once the job is done or failed)
+_handlers: Dict[str, tuple] = {}
+_runners = []
+_wakeup: Optional[asyncio.Event] = None
+
+
+class JobProgress:
+    """Progress of a running job, saved on its document for /jobs/{job_id}"""
+
+    def __init__(self, job_id: str):
+        self.job_id = job_id
+
+    async def stage(self, name: str, **fields):
+        """Enter a new stage (with any progress fields known at its start)"""
+        await self.update(stage=name, stage_started_at=datetime.utcnow(), **fields)
+
+    async def update(self, **fields):
+        now = datetime.utcnow()
+        await upload_jobs_collection.update_one(
+            {"_id": self.job_id},
+            {"$set": {"heartbeat_at": now, **{f"progress.{key}": value for key, value in fields.items()}}}
+        )
+
+
+def register_job_handler(
+    kind: str,
+    run: Callable[[dict, JobProgress], Awaitable[dict]],
+    finish: Optional[Callable[[dict], Awaitable[None]]] = None
+):
+    _handlers[kind] = (run, finish)
+
+async def create_job_indexes():
+    await upload_jobs_collection.create_index([("status", 1), ("created_at", 1)])
+    await upload_jobs_collection.create_index([("kind", 1), ("status", 1), ("finished_at", -1)])
+    await upload_jobs_collection.create_index([("finished_at", 1)], expireAfterSeconds=JOB_RETENTION_SECONDS)
+
+async def submit_job(kind: str, params: dict, submitted_by: str) -> dict:
+    """Queue a job; a runner of this (or any other) API process picks it up"""
+    now = datetime.utcnow()
+    job = {
+        "_id": str(uuid.uuid4()),
+        "kind": kind,
+        "params": params,
+        "status": "queued",
+        "progress": {"stage": "queued", "stage_started_at": now},
+        "attempts": 0,
+        "submitted_by": submitted_by,
+        "created_at": now,
+        "started_at": None,
+        "heartbeat_at": None,
+        "finished_at": None,
+        "result": None,
+        "error": None
+    }
+    await upload_jobs_collection.insert_one(job)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+async def get_job(job_id: str) -> Optional[dict]:
+    return await upload_jobs_collection.find_one({"_id": job_id})
+
+async def wait_for_job(job_id: str, poll_seconds: float = 0.2) -> dict:
+    """Wait until a job is done or failed and return its document (None if the job was deleted)"""
+    while True:
+        job = await get_job(job_id)
+        if job is None or job["status"] in FINISHED_STATUSES:
+            return job
+        await asyncio.sleep(poll_seconds)
+
+async def _claim_job() -> Optional[dict]:
+    now = datetime.utcnow()
+    return await upload_jobs_collection.find_one_and_update(
+        {"kind": {"$in": list(_handlers)}, "$or": [
+            {"status": "queued"},
+            {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=JOB_STALE_SECONDS)}}
+        ]},
+        {"$set": {"status": "running", "started_at": now, "heartbeat_at": now}, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+async def _finish_job(job: dict, fields: dict):
+    fields = {**fields, "finished_at": datetime.utcnow()}
+    fields["progress.stage"] = fields["status"]
+    await upload_jobs_collection.update_one({"_id": job["_id"]}, {"$set": fields})
+    finish = _handlers[job["kind"]][1]
+    if finish is not None:
+        try:
+            await finish(job)
+        except Exception as e:
+            print(f"⚠️ Cleanup of job {job['_id']} failed: {e}")
+
+async def _heartbeat(job_id: str):
+    while True:
+        await asyncio.sleep(JOB_HEARTBEAT_SECONDS)
+        await upload_jobs_collection.update_one({"_id": job_id}, {"$set": {"heartbeat_at": datetime.utcnow()}})
+
+async def _run_job(job: dict):
+    if job["attempts"] > JOB_MAX_ATTEMPTS:
+        await _finish_job(job, {"status": "failed", "error": f"Gave up after {JOB_MAX_ATTEMPTS} interrupted attempts"})
+        return
+
+    run = _handlers[job["kind"]][0]
+    heartbeat = asyncio.create_task(_heartbeat(job["_id"]))
+    try:
+        result = await run(job, JobProgress(job["_id"]))
+    except asyncio.CancelledError:
+        # Shutdown: the job goes back in the queue for the next start
+        await upload_jobs_collection.update_one(
+            {"_id": job["_id"]}, {"$set": {"status": "queued"}, "$inc": {"attempts": -1}}
+        )
+        raise
+    except HTTPException as e:
+        if e.status_code == 503:
+            # Worker pool full: back in the queue without using up an attempt.
+            # A worker that died counts as an interrupted attempt, so a file that
+            # crashes the parser every time is given up on after JOB_MAX_ATTEMPTS.
+            await upload_jobs_collection.update_one(
+                {"_id": job["_id"]},
+                {"$set": {"status": "queued"}, "$inc": {"attempts": -1 if e.detail == CPU_BUSY_DETAIL else 0}}
+            )
+            await asyncio.sleep(JOB_POLL_SECONDS)
+            return
+        await _finish_job(job, {"status": "failed", "error": e.detail})
+    except Exception as e:
+        print(f"❌ Job {job['_id']} ({job['kind']}) failed: {e}")
+        await _finish_job(job, {"status": "failed", "error": str(e)})
+    else:
+        await _finish_job(job, {"status": "done", "result": result})
+    finally:
+        heartbeat.cancel()
+
+async def _runner_loop():
+    while True:
+        try:
+            job = await _claim_job()
+        except Exception as e:
+            print(f"⚠️ Could not claim a job: {e}")
+            job = None
+
+        if job is not None:
+            try:
+                await _run_job(job)
+            except Exception as e:
+                print(f"⚠️ Job {job['_id']} could not be finished: {e}")
+            continue
+
+        _wakeup.clear()
+        try:
+            await asyncio.wait_for(_wakeup.wait(), timeout=JOB_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+def start_job_runners():
+    global _wakeup
+    _wakeup = asyncio.Event()
+    for _ in range(JOB_WORKERS):
+        _runners.append(asyncio.create_task(_runner_loop()))
+    print(f"✅ Started {JOB_WORKERS} job runners")
+
+async def stop_job_runners():
+    """Stop the runners; the jobs they were running go back in the queue"""
+    for runner in _runners:
+        runner.cancel()
+    await asyncio.gather(*_runners, return_exceptions=True)
+    _runners.clear()
+
+# ==================== PROGRESS REPORTS ====================
+
+async def parse_rate(kind: str, samples: int = 20) -> Optional[float]:
+    """Bytes parsed per second by recent finished jobs of a kind (None before any)"""
+    total_bytes = 0
+    total_seconds = 0.0
+    async for job in upload_jobs_collection.find(
+        {"kind": kind, "status": "done", "result.timings.parse_seconds": {"$gt": 0}},
+        projection={"params.file_size": 1, "result.timings.parse_seconds": 1},
+        sort=[("finished_at", -1)],
+        limit=samples
+    ):
+        total_bytes += job["params"]["file_size"]
+        total_seconds += job["result"]["timings"]["parse_seconds"]
+    return total_bytes / total_seconds if total_seconds else None
+
+def estimate_seconds_left(job: dict, bytes_per_second: Optional[float]) -> Optional[float]:
+    """
+    Time left in the current stage of a running job: parsing is estimated
+    from the file size and the parse rate of earlier jobs, storing from
+    this job's own rows-per-second so far. None when there is no basis.
+    """
+    progress = job.get("progress") or {}
+    stage = progress.get("stage")
+    started = progress.get("stage_started_at")
+    if job["status"] != "running" or started is None:
+        return None
+    elapsed = (datetime.utcnow() - started).total_seconds()
+
+    if stage == "parsing" and bytes_per_second:
+        return max(0.0, job["params"]["file_size"] / bytes_per_second - elapsed)
+    rows_total, rows_stored = progress.get("rows_total"), progress.get("rows_stored")
+    if stage == "storing" and rows_total and rows_stored:
+        return elapsed / rows_stored * (rows_total - rows_stored)
+    return None
+
+def job_report(job: dict, bytes_per_second: Optional[float] = None) -> dict:
+    """Public view of a job document (/jobs/{job_id})"""
+    progress = job.get("progress") or {}
+    eta = estimate_seconds_left(job, bytes_per_second)
+    return {
+        "job_id": job["_id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "stage": progress.get("stage"),
+        "progress": {key: value for key, value in progress.items() if key not in ("stage", "stage_started_at")},
+        "eta_seconds": round(eta, 1) if eta is not None else None,
+        "attempts": job["attempts"],
+        "params": {key: value for key, value in job["params"].items() if not key.startswith("_")},
+        "submitted_by": job["submitted_by"],
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "result": job["result"],
+        "error": job["error"]
+    }
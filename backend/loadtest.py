@@ -0,0 +1,97 @@
+"""
+Mixed-load latency tool for a running API server. It reports latency
+percentiles for whatever server it runs against; no reference results are
+kept in the repo, so compare runs taken on the same machine and mongod.
+
+Start the API against a local mongod, then run from the backend folder:
+
+    MONGODB_URL=mongodb://localhost:27017 uvicorn main:app --port 8000
+    python loadtest.py --url http://localhost:8000 --clients 200 --duration 30
+
+Requires httpx (pip install httpx).
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import defaultdict
+
+import httpx
+
+def percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/token", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def run_client(client: httpx.AsyncClient, requests: list, deadline: float, latencies: dict, errors: dict):
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        name, method, path, body = rng.choice(requests)
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, path, json=body)
+            if response.status_code >= 400:
+                errors[name] += 1
+        except httpx.HTTPError:
+            errors[name] += 1
+        latencies[name].append(time.perf_counter() - start)
+
+async def main_async(args):
+    limits = httpx.Limits(max_connections=args.clients, max_keepalive_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        token = await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        # Mixed load: cheap auth/status calls alongside the analysis endpoints
+        requests = [
+            ("verify-token", "GET", "/verify-token", None),
+            ("boards", "GET", "/boards", None),
+            ("db-status", "GET", f"/board/{args.board}/db-status", None),
+            ("fmeca-data", "POST", f"/fmeca-data/{args.board}", {"board_id": args.board, "filter_type": "all"}),
+            ("fmeca-data red", "POST", f"/fmeca-data/{args.board}", {"board_id": args.board, "filter_type": "red"}),
+            ("atm-check", "GET", f"/atm-check/{args.board}", None),
+        ]
+
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        deadline = time.perf_counter() + args.duration
+
+        started = time.perf_counter()
+        await asyncio.gather(*[
+            run_client(client, requests, deadline, latencies, errors)
+            for _ in range(args.clients)
+        ])
+        elapsed = time.perf_counter() - started
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    print(f"{args.clients} clients, {elapsed:.1f}s, {len(all_latencies)} requests, "
+          f"{len(all_latencies) / elapsed:.1f} req/s")
+    print(f"{'endpoint':<16} {'count':>7} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name in sorted(latencies) + ["total"]:
+        values = all_latencies if name == "total" else latencies[name]
+        error_count = sum(errors.values()) if name == "total" else errors[name]
+        if not values:
+            continue
+        print(f"{name:<16} {len(values):>7} {error_count:>7} "
+              f"{percentile(values, 0.50) * 1000:>9.1f} "
+              f"{percentile(values, 0.95) * 1000:>9.1f} "
+              f"{percentile(values, 0.99) * 1000:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent mixed-load test with latency percentiles")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--username", default="admin")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--board", type=int, default=1, help="Board with FMECA and coverage data uploaded")
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -4,13 +4,11 @@ from datetime import datetime, timedelta
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from fastapi import FastAPI, HTTPException, Depends, status, Body, File, UploadFile, Form
+from fastapi import FastAPI, HTTPException, Depends, status, Body, File, UploadFile, Form, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, StreamingResponse
 from jose import JWTError, jwt
 import pandas as pd
-import numpy as np
-import re
 import os
 from PIL import Image, ImageDraw
 import io
@@ -19,6 +17,10 @@ import shutil
 from pathlib import Path
 import uuid
 import json
+import hashlib
+import asyncio
+import time
+import tempfile
 from enum import Enum
 from dotenv import load_dotenv
 
@@ -32,10 +34,31 @@ from auth import (
     LoginRequest, RegisterRequest, register_user, get_all_users,
     update_user_password, delete_user, get_user_by_id, create_user, UserCreate,
     users_collection, update_user_last_login, update_user, UserUpdate,
-    get_users_by_role, search_users, ROLES, db
+    get_users_by_role, search_users, ROLES, db,
+    get_cached_user_by_username, invalidate_cached_user, principal_cache
 )
 
-app = FastAPI(title="FMECA-HWATM Integrations API", version="2.0.0")
+from cache import LRUCache
+from compression import CompressionMiddleware
+from responses import FastJSONResponse, json_bytes
+from analysis import BoardAnalysis, detect_column_roles, role_columns, ANALYSIS_RESULT_VERSION, RPN_FILTERS
+from ingest import (
+    build_row_index, dataframe_to_stored_data, detect_storage_format, diff_key_column, diff_row_indexes,
+    parse_excel_upload, stored_column_names, stored_data_to_dataframe, stored_data_to_records,
+    stored_row_count, ROW_INDEX_VERSION, STORAGE_FORMAT_VERSION
+)
+from storage import (
+    create_chunk_indexes, delete_chunks, iter_stored_rows, load_analysis_result, load_designator_index,
+    delete_file_results, load_row_diff, load_row_index, load_stored_data, load_stored_rows_at, save_analysis_result,
+    save_chunks, save_designator_index, save_row_diff, save_row_index, stored_file_id
+)
+from workers import run_cpu_task, shutdown_workers, worker_stats, CPU_WORKERS
+from jobs import (
+    create_job_indexes, get_job, job_report, parse_rate, register_job_handler, start_job_runners,
+    stop_job_runners, submit_job, wait_for_job, JobProgress
+)
+
+app = FastAPI(title="FMECA-HWATM Integrations API", version="2.0.0", default_response_class=FastJSONResponse)
 
 # OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -49,16 +72,68 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Response compression: encodings offered in preference order ("" disables;
+# "br" needs the brotli package), bodies under the minimum size are sent as is
+RESPONSE_COMPRESSION = [encoding.strip() for encoding in os.getenv("RESPONSE_COMPRESSION", "br,gzip").split(",") if encoding.strip()]
+COMPRESSION_MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
+BROTLI_COMPRESSION_QUALITY = int(os.getenv("BROTLI_COMPRESSION_QUALITY", "5"))
+
+app.add_middleware(
+    CompressionMiddleware,
+    encodings=RESPONSE_COMPRESSION,
+    minimum_size=COMPRESSION_MINIMUM_SIZE,
+    gzip_level=GZIP_COMPRESSION_LEVEL,
+    brotli_quality=BROTLI_COMPRESSION_QUALITY
+)
+
 # File upload configuration (only for images if needed)
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+# Excel uploads wait here for their background job (kept on disk so queued jobs survive a restart)
+UPLOAD_JOB_DIR = Path(os.getenv("UPLOAD_JOB_DIR", str(UPLOAD_DIR / "jobs")))
+UPLOAD_JOB_DIR.mkdir(parents=True, exist_ok=True)
+
 ALLOWED_EXTENSIONS = {
     'excel': ['.xlsx', '.xls'],
     'image': ['.png', '.jpg', '.jpeg', '.gif', '.bmp']
 }
 
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+UPLOAD_SPOOL_CHUNK_SIZE = 1024 * 1024  # Bytes read from an upload at a time
+
+# Rows built and sent per batch by streamed /fmeca-data responses
+FMECA_STREAM_BATCH_SIZE = int(os.getenv("FMECA_STREAM_BATCH_SIZE", "1000"))
+
+# Page size bounds of /get/excel-data/{board_id}/rows
+EXCEL_ROWS_DEFAULT_LIMIT = int(os.getenv("EXCEL_ROWS_DEFAULT_LIMIT", "1000"))
+EXCEL_ROWS_MAX_LIMIT = int(os.getenv("EXCEL_ROWS_MAX_LIMIT", "50000"))
+
+# Rows of each kind (added / removed / changed) returned by /board/{board_id}/diff by default
+DIFF_ROWS_DEFAULT_LIMIT = int(os.getenv("DIFF_ROWS_DEFAULT_LIMIT", "100"))
+
+# Parsed DataFrame cache (entries are (board_id, file_type, version, record_id))
+DATAFRAME_CACHE_SIZE = int(os.getenv("DATAFRAME_CACHE_SIZE", "32"))
+dataframe_cache = LRUCache("dataframes", DATAFRAME_CACHE_SIZE)
+
+# Joined analysis cache (entries are (board_id, fmeca_key, coverage_key))
+ANALYSIS_CACHE_SIZE = int(os.getenv("ANALYSIS_CACHE_SIZE", "16"))
+analysis_cache = LRUCache("analyses", ANALYSIS_CACHE_SIZE)
+
+# Designator index cache (entries are file ids; an index never changes once its file is stored)
+DESIGNATOR_INDEX_CACHE_SIZE = int(os.getenv("DESIGNATOR_INDEX_CACHE_SIZE", "32"))
+designator_index_cache = LRUCache("designator_indexes", DESIGNATOR_INDEX_CACHE_SIZE)
+
+# Upload deduplication counters since startup (reported by uploads and /admin/cache-stats)
+upload_dedup_counts = {"uploads": 0, "upload_hash_hits": 0, "data_hash_hits": 0}
+
+# Boards analyzed at once by /portfolio (each may run two worker pool tasks)
+PORTFOLIO_CONCURRENCY = int(os.getenv("PORTFOLIO_CONCURRENCY", str(max(1, CPU_WORKERS))))
+
+# Board responses change only on upload or delete: clients may keep them but
+# must revalidate (If-None-Match) on every use
+DATA_CACHE_CONTROL = os.getenv("DATA_CACHE_CONTROL", "private, no-cache")
 
 # MongoDB collections
 excel_files_collection = db.excel_files
@@ -82,6 +157,10 @@ class BoardInfo(BaseModel):
 class FilterRequest(BaseModel):
     board_id: int
     filter_type: str
+    offset: int = 0                # First row of the page (rows are sorted by RPN, descending)
+    limit: Optional[int] = None    # Page size (default: every row from offset)
+    stream: bool = False           # Stream NDJSON rows, paging fields in X-* headers
+    format: str = "json"           # "json" (list of row objects) or "columnar" ({field: values})
 
 class FMECAData(BaseModel):
     ID: str
@@ -183,17 +262,28 @@ BOARD_CONFIG = {
 # Startup event
 @app.on_event("startup")
 async def startup_db_client():
-    create_indexes()
-    init_default_users()
-    create_excel_indexes()
+    await create_indexes()
+    await init_default_users()
+    await create_excel_indexes()
+    await create_job_indexes()
     print("✅ MongoDB initialized with default users")
     print("✅ Excel files indexes created")
+    start_job_runners()
+
+@app.on_event("shutdown")
+async def shutdown_worker_pool():
+    await stop_job_runners()
+    shutdown_workers()
 
 # Create indexes for excel files collection
-def create_excel_indexes():
-    excel_files_collection.create_index([("board_id", 1), ("file_type", 1)])
-    excel_files_collection.create_index([("upload_date", -1)])
-    excel_files_collection.create_index([("board_id", 1), ("file_type", 1), ("version", -1)])
+async def create_excel_indexes():
+    await excel_files_collection.create_index([("board_id", 1), ("file_type", 1)])
+    await excel_files_collection.create_index([("upload_date", -1)])
+    await excel_files_collection.create_index([("board_id", 1), ("file_type", 1), ("version", -1)])
+    await excel_files_collection.create_index([("board_id", 1), ("file_type", 1), ("upload_hash", 1)])
+    await excel_files_collection.create_index([("board_id", 1), ("file_type", 1), ("data_hash", 1)])
+    await excel_files_collection.create_index([("data_file_id", 1)], sparse=True)
+    await create_chunk_indexes()
     print("✅ Excel files indexes created")
 
 # Helper functions
@@ -208,6 +298,32 @@ def get_file_size_from_bytes(content: bytes) -> int:
     """Get file size from bytes"""
     return len(content)
 
+async def spool_upload(file: UploadFile, directory: Optional[Path] = None) -> tuple:
+    """
+    Copy an upload to a temp file (in directory, default the system temp
+    folder) chunk by chunk, enforcing MAX_FILE_SIZE and hashing it while
+    streaming. Returns (path, size, SHA-256 hex digest); the caller
+    removes the file.
+    """
+    if file.size is not None and file.size > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_FILE_SIZE // (1024 * 1024)}MB limit")
+    
+    spool = tempfile.NamedTemporaryFile(suffix=Path(file.filename).suffix, dir=directory, delete=False)
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        with spool:
+            while chunk := await file.read(UPLOAD_SPOOL_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise HTTPException(status_code=413, detail=f"File exceeds the {MAX_FILE_SIZE // (1024 * 1024)}MB limit")
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        os.unlink(spool.name)
+        raise
+    return spool.name, size, digest.hexdigest()
+
 def create_colored_placeholder(board_name: str, board_id: int) -> Optional[str]:
     """Create a colored placeholder image"""
     try:
@@ -252,25 +368,64 @@ def load_board_image(board_id: int) -> Optional[str]:
     print(f"⚠️ No image found for {board_name}, using placeholder")
     return create_colored_placeholder(board_name, board_id)
 
-def check_board_files(board_id: int) -> dict:
+async def get_board_file_status(board_ids: Optional[List[int]] = None) -> Dict[int, dict]:
+    """
+    Get presence, latest version and record counts of the stored files of
+    every board in one aggregation (one round trip instead of one query per
+    board and file type). Returns {board_id: {file_type: info}}.
+    """
+    if board_ids is None:
+        board_ids = list(BOARD_CONFIG.keys())
+    
+    # Row count of older records (without record_count) without shipping the sheet itself
+    stored_rows = {"$cond": [
+        {"$isArray": "$data"},
+        {"$size": "$data"},
+        {"$cond": [{"$isArray": "$data.data"}, {"$size": "$data.data"}, None]}
+    ]}
+    
+    pipeline = [
+        {"$match": {"board_id": {"$in": board_ids}}},
+        # Walks the (board_id, file_type, version) index, latest version first
+        {"$sort": {"board_id": 1, "file_type": 1, "version": -1}},
+        {"$group": {
+            "_id": {"board_id": "$board_id", "file_type": "$file_type"},
+            "version_count": {"$sum": 1},
+            "file_id": {"$first": "$_id"},
+            "version": {"$first": {"$ifNull": ["$version", 1]}},
+            "upload_date": {"$first": "$upload_date"},
+            "uploaded_by": {"$first": "$uploaded_by"},
+            "record_count": {"$first": {"$ifNull": ["$record_count", stored_rows]}}
+        }}
+    ]
+    
+    status_by_board = {board_id: {} for board_id in board_ids}
+    async for group in excel_files_collection.aggregate(pipeline):
+        board_id = group["_id"]["board_id"]
+        file_type = group["_id"]["file_type"]
+        status_by_board.setdefault(board_id, {})[file_type] = {
+            "file_id": group["file_id"],
+            "version": group["version"],
+            "version_count": group["version_count"],
+            "upload_date": group["upload_date"],
+            "uploaded_by": group["uploaded_by"],
+            "record_count": group["record_count"]
+        }
+    return status_by_board
+
+async def check_board_files(board_id: int, file_status: Optional[dict] = None) -> dict:
     """Check what files exist for a board in database only"""
     board_config = BOARD_CONFIG.get(board_id)
     if not board_config:
         return {"fmeca_exists": False, "coverage_exists": False, "image_exists": False,
                 "fmeca_db_exists": False, "coverage_db_exists": False}
     
-    board_name = board_config["name"]
-    
     # Check if data exists in database only (no local files)
-    fmeca_db_exists = excel_files_collection.count_documents({
-        "board_id": board_id, 
-        "file_type": "fmeca"
-    }) > 0
+    if file_status is None:
+        file_status = (await get_board_file_status([board_id]))[board_id]
     
-    coverage_db_exists = excel_files_collection.count_documents({
-        "board_id": board_id, 
-        "file_type": "coverage"
-    }) > 0
+    fmeca_db_exists = "fmeca" in file_status
+    coverage_db_exists = "coverage" in file_status
     
     # Check for image
     image_exists = False
@@ -285,128 +440,305 @@ def check_board_files(board_id: int) -> dict:
         "coverage_db_exists": coverage_db_exists
     }
 
-def load_main_data(board_id: int) -> pd.DataFrame:
-    """Load FMECA data for specific board - Only from database"""
-    try:
-        # Load from database only
-        df_from_db = load_main_data_from_db(board_id)
-        if not df_from_db.empty:
-            return df_from_db
-        
-        print(f"❌ No FMECA data found in database for board {board_id}")
-        return pd.DataFrame()
-        
-    except Exception as e:
-        print(f"❌ Error loading FMECA data: {e}")
-        return pd.DataFrame()
-
-def load_main_data_from_db(board_id: int) -> pd.DataFrame:
-    """Load FMECA data from MongoDB"""
-    try:
-        # Get latest FMECA data from DB
-        record = excel_files_collection.find_one(
-            {"board_id": board_id, "file_type": "fmeca"},
-            sort=[("upload_date", -1)]
-        )
-        
-        if not record:
-            print(f"⚠️ No FMECA data in DB for board {board_id}")
-            return pd.DataFrame()
-        
-        data = record["data"]
-        
-        # Convert back to DataFrame
-        if isinstance(data, dict) and "data" in data and "columns" in data:
-            df = pd.DataFrame(data["data"], columns=data["columns"])
-        else:
-            df = pd.DataFrame(data)
-        
-        print(f"✅ FMECA data loaded from DB: {len(df)} rows")
-        return df
-        
-    except Exception as e:
-        print(f"❌ Error loading from DB: {e}")
-        return pd.DataFrame()
-
-def load_reference_data(board_id: int) -> pd.DataFrame:
-    """Load coverage data for specific board - Only from database"""
-    try:
-        # Load from database only
-        df_from_db = load_reference_data_from_db(board_id)
-        if not df_from_db.empty:
-            return df_from_db
-        
-        print(f"❌ No coverage data found in database for board {board_id}")
-        return pd.DataFrame()
-        
-    except Exception as e:
-        print(f"❌ Error loading coverage data: {e}")
-        return pd.DataFrame()
+async def excel_record_to_dataframe(record: dict, columns: Optional[List] = None) -> pd.DataFrame:
+    """Rebuild a DataFrame (optionally only some columns) from a stored excel_files document"""
+    df = stored_data_to_dataframe(await load_stored_data(record, columns))
+    if columns is not None and df.columns.tolist() != columns:
+        # Inline (format 1/2) sheets are read whole and narrowed here
+        df = df[columns]
+    return df
+
+async def get_latest_record_key(board_id: int, file_type: str) -> Optional[tuple]:
+    """Get (version, record_id) of the latest record with a cheap projected query"""
+    latest = await excel_files_collection.find_one(
+        {"board_id": board_id, "file_type": file_type},
+        projection={"_id": 1, "version": 1},
+        sort=[("upload_date", -1)]
+    )
+    if not latest:
+        return None
+    return (latest.get("version", 1), latest["_id"])
 
-def load_reference_data_from_db(board_id: int) -> pd.DataFrame:
-    """Load coverage data from MongoDB"""
-    try:
-        # Get latest coverage data from DB
-        record = excel_files_collection.find_one(
-            {"board_id": board_id, "file_type": "coverage"},
-            sort=[("upload_date", -1)]
-        )
-        
-        if not record:
-            print(f"⚠️ No coverage data in DB for board {board_id}")
-            return pd.DataFrame()
-        
-        data = record["data"]
-        
-        # Convert back to DataFrame
-        if isinstance(data, dict) and "data" in data and "columns" in data:
-            df = pd.DataFrame(data["data"], columns=data["columns"])
-        else:
-            df = pd.DataFrame(data)
-        
-        print(f"✅ Coverage data loaded from DB: {len(df)} rows")
+async def load_excel_frame(
+    board_id: int, file_type: str, record_key: tuple, columns: Optional[List] = None
+) -> Optional[pd.DataFrame]:
+    """
+    Load the sheet of one record (or only the given columns), reusing the
+    parsed DataFrame when cached. Cached frames are shared, so callers must
+    not modify them in place.
+    """
+    cache_key = (board_id, file_type) + record_key + (tuple(columns) if columns is not None else None,)
+    df = dataframe_cache.get(cache_key)
+    if df is not None:
         return df
-        
-    except Exception as e:
-        print(f"❌ Error loading from DB: {e}")
-        return pd.DataFrame()
-
-def extract_designators(text: str) -> set:
-    if pd.isna(text) or text == '':
-        return set()
     
-    text = str(text).upper().strip()
-    designators = set()
+    record = await excel_files_collection.find_one({"_id": record_key[1]})
+    if not record:
+        return None
     
-    parentheses_matches = re.findall(r'\(([A-Z]{1,3}\d{1,4}[A-Z]?\d?)\)', text)
-    designators.update(parentheses_matches)
+    df = await excel_record_to_dataframe(record, columns)
+    dataframe_cache.put(cache_key, df)
+    return df
+
+async def get_designator_index(file_id: str) -> Optional[dict]:
+    """Load the designator index of a file from MongoDB (or the designator index cache)"""
+    index = designator_index_cache.get(file_id)
+    if index is None:
+        index = await load_designator_index(file_id)
+        # Missing indexes aren't cached, so one built later by migrate.py is picked up
+        if index is not None:
+            designator_index_cache.put(file_id, index)
+    return index
+
+async def load_analysis_frame(board_id: int, file_type: str, record_key: tuple) -> tuple:
+    """
+    Load only the columns the analysis uses, per the column roles stored
+    at upload, with the designator index of the sheet (None for sheets
+    stored before indexes were). Records from before roles were stored
+    get them detected from the full sheet and saved.
+    Returns (DataFrame or None, roles, designator index).
+    """
+    record = await excel_files_collection.find_one(
+        {"_id": record_key[1]}, projection={"column_roles": 1, "data_file_id": 1}
+    )
+    if not record:
+        return None, None, None
     
-    standalone_matches = re.findall(r'\b([A-Z]{1,10}\d{1,4}[A-Z]?\d?)\b', text)
-    designators.update(standalone_matches)
+    designator_index = await get_designator_index(stored_file_id(record))
     
-    complex_matches = re.findall(r'[A-Z]{1,10}\s*\d{1,4}[A-Z]?\d?', text.replace(' ', ''))
-    designators.update(complex_matches)
+    roles = record.get("column_roles")
+    if roles is None:
+        df = await load_excel_frame(board_id, file_type, record_key)
+        if df is None:
+            return None, None, None
+        roles = detect_column_roles(df, file_type)
+        await excel_files_collection.update_one({"_id": record_key[1]}, {"$set": {"column_roles": roles}})
+        return df[role_columns(roles)], roles, designator_index
     
-    return designators
+    df = await load_excel_frame(board_id, file_type, record_key, role_columns(roles))
+    return df, roles, designator_index
+
+async def get_board_record_keys(board_id: int) -> tuple:
+    """Get the (version, record_id) keys of the latest FMECA and coverage records of a board"""
+    return (
+        await get_latest_record_key(board_id, "fmeca"),
+        await get_latest_record_key(board_id, "coverage")
+    )
 
-def extract_complete_designators(text: str) -> set:
-    if pd.isna(text) or text == '':
-        return set()
+async def get_board_analysis(board_id: int, record_keys: Optional[tuple] = None) -> BoardAnalysis:
+    """
+    Get the shared analysis of the latest FMECA and coverage versions of a
+    board (or of the record_keys already looked up by get_board_record_keys)
+    """
+    fmeca_key, coverage_key = record_keys if record_keys is not None else await get_board_record_keys(board_id)
     
-    text = str(text).upper().strip()
-    designators = set()
+    cache_key = (board_id, fmeca_key, coverage_key)
+    analysis = analysis_cache.get(cache_key)
+    if analysis is not None:
+        return analysis
     
-    pattern = r'\b([A-Z]{1,10}\d{1,4}(?:[A-Z]\d?)?)\b'
-    matches = re.findall(pattern, text)
-    designators.update(matches)
+    df, fmeca_roles, fmeca_index = (
+        await load_analysis_frame(board_id, "fmeca", fmeca_key) if fmeca_key else (None, None, None)
+    )
+    ref_df, coverage_roles, coverage_index = (
+        await load_analysis_frame(board_id, "coverage", coverage_key) if coverage_key else (None, None, None)
+    )
     
-    parentheses_matches = re.findall(r'\(([A-Z]{1,10}\d{1,4}(?:[A-Z]\d?)?)\)', text)
-    designators.update(parentheses_matches)
+    # Join / ATM check results of this version pair left by an earlier process
+    stored_result = None
+    save_result = None
+    if fmeca_key and coverage_key:
+        fmeca_id, coverage_id = fmeca_key[1], coverage_key[1]
+        stored_result = await load_analysis_result(fmeca_id, coverage_id, ANALYSIS_RESULT_VERSION)
+        
+        async def _store_result(fields: dict):
+            try:
+                await save_analysis_result(fmeca_id, coverage_id, ANALYSIS_RESULT_VERSION, fields)
+            except Exception as e:
+                print(f"⚠️ Could not store analysis results of board {board_id}: {e}")
+        save_result = _store_result
     
-    return designators
+    analysis = BoardAnalysis(
+        df if df is not None else pd.DataFrame(),
+        ref_df if ref_df is not None else pd.DataFrame(),
+        fmeca_roles,
+        coverage_roles,
+        fmeca_index,
+        coverage_index,
+        stored_result,
+        save_result
+    )
+    analysis_cache.put(cache_key, analysis)
+    return analysis
+
+def invalidate_board_caches(board_id: int, file_type: str):
+    """Drop cached DataFrames and analyses of a board after its records change"""
+    dataframe_cache.invalidate(lambda key: key[0] == board_id and key[1] == file_type)
+    analysis_cache.invalidate(lambda key: key[0] == board_id)
+
+# ==================== VERSION DIFFS ====================
+
+async def find_version_record(board_id: int, file_type: str, version: Optional[int] = None,
+                              before_version: Optional[int] = None) -> Optional[dict]:
+    """
+    Get the excel_files document of one version of a sheet (default: the
+    latest, or the latest before before_version). Rows are left out of
+    chunked documents; inline (format 1/2) documents are read whole.
+    """
+    query = {"board_id": board_id, "file_type": file_type}
+    if version is not None:
+        query["version"] = version
+    elif before_version is not None:
+        query["version"] = {"$lt": before_version}
+    record = await excel_files_collection.find_one(
+        query, projection={"data.arrays": 0, "data.data": 0}, sort=[("version", -1)]
+    )
+    if record is not None and detect_storage_format(record["data"]) != 3:
+        record = await excel_files_collection.find_one({"_id": record["_id"]})
+    return record
+
+async def get_row_index(record: dict) -> dict:
+    """
+    Load the row index of a stored file. Files stored before row indexes
+    were (or with an outdated one) get it built from the sheet and saved.
+    """
+    index = await load_row_index(stored_file_id(record))
+    if index is not None and index.get("index_version") == ROW_INDEX_VERSION:
+        return index
+    
+    df = stored_data_to_dataframe(await load_stored_data(record))
+    roles = record.get("column_roles") or detect_column_roles(df, record["file_type"])
+    index = await run_cpu_task(
+        "row_index", build_row_index, dataframe_to_stored_data(df), diff_key_column(roles, record["file_type"])
+    )
+    await save_row_index(stored_file_id(record), index)
+    return index
+
+async def store_version_diff(previous: dict, record: dict, row_index: dict) -> dict:
+    """Diff a just stored file against the version before it and store the result"""
+    diff = await run_cpu_task("row_diff", diff_row_indexes, await get_row_index(previous), row_index)
+    diff.update({
+        "from_id": previous["_id"],
+        "from_version": previous.get("version", 1),
+        "to_version": record["version"],
+        "key_column": row_index["key_column"]
+    })
+    await save_row_diff(record["_id"], diff)
+    return diff
+
+def diff_counts(diff: dict) -> dict:
+    return {
+        "added": len(diff["added"]),
+        "removed": len(diff["removed"]),
+        "changed": len(diff["changed"]),
+        "unchanged": diff["unchanged"]
+    }
+
+async def diff_against_previous(previous: Optional[dict], record: dict, row_index: dict) -> Optional[dict]:
+    """Store the diff of a new version against the one before it; returns the counts (None without one)"""
+    if not previous:
+        return None
+    try:
+        diff = await store_version_diff(previous, record, row_index)
+        return {"from_version": diff["from_version"], **diff_counts(diff)}
+    except Exception as e:
+        print(f"⚠️ Could not diff {record['_id']} against version {previous.get('version', 1)}: {e}")
+        return None
+
+# ==================== UPLOAD DEDUPLICATION ====================
+
+async def find_duplicate_record(board_id: int, file_type: str, hash_field: str, value: str) -> Optional[dict]:
+    """Latest stored version of a board's sheet with the given upload_hash / data_hash"""
+    return await excel_files_collection.find_one(
+        {"board_id": board_id, "file_type": file_type, hash_field: value},
+        projection={"data.arrays": 0, "data.data": 0},
+        sort=[("version", -1)]
+    )
+
+async def reuse_stored_version(existing: dict, filename: str, file_size: int, upload_hash: str, username: str) -> tuple:
+    """
+    Resolve an upload identical to a stored version without storing it:
+    if that version's data is the latest, the upload points at it; else
+    an alias version sharing its rows and indexes is added, so history
+    records the older data becoming current again.
+    Returns (record the upload resolves to, whether an alias was added, diff counts).
+    """
+    latest = await find_version_record(existing["board_id"], existing["file_type"])
+    if stored_file_id(latest) == stored_file_id(existing):
+        return latest, False, None
+    
+    alias_id = str(uuid.uuid4())
+    alias = {
+        **{field: existing.get(field) for field in (
+            "board_id", "board_name", "file_type", "sheet_name", "column_roles",
+            "record_count", "storage_format", "data", "data_hash"
+        )},
+        "_id": alias_id,
+        "data_file_id": stored_file_id(existing),
+        "original_filename": filename,
+        "stored_filename": f"{alias_id}.json",
+        "file_size": file_size,
+        "upload_hash": upload_hash,
+        "upload_date": datetime.utcnow(),
+        "uploaded_by": username,
+        "version": latest.get("version", 1) + 1
+    }
+    await excel_files_collection.insert_one(alias)
+    invalidate_board_caches(alias["board_id"], alias["file_type"])
+    
+    diff_summary = await diff_against_previous(latest, alias, await get_row_index(alias))
+    return alias, True, diff_summary
+
+def record_upload_dedup(match: Optional[str]):
+    upload_dedup_counts["uploads"] += 1
+    if match is not None:
+        upload_dedup_counts[f"{match}_hash_hits"] += 1
+
+def upload_dedup_stats() -> dict:
+    uploads = upload_dedup_counts["uploads"]
+    hits = upload_dedup_counts["upload_hash_hits"] + upload_dedup_counts["data_hash_hits"]
+    return {**upload_dedup_counts, "hit_rate": round(hits / uploads, 4) if uploads else None}
+
+async def release_stored_data(record: dict):
+    """
+    Delete what was stored for a deleted excel_files record. Rows and
+    indexes shared with alias versions stay until none of them is left.
+    """
+    await delete_file_results([record["_id"]])
+    data_file_id = stored_file_id(record)
+    still_used = await excel_files_collection.find_one(
+        {"$or": [{"_id": data_file_id}, {"data_file_id": data_file_id}]}, projection={"_id": 1}
+    )
+    if still_used is None:
+        await delete_chunks([data_file_id])
+
+# ==================== CONDITIONAL REQUESTS ====================
+
+def data_etag(*parts) -> str:
+    """Strong ETag of a response, derived from the stored record keys (and parameters) it depends on"""
+    canonical = json.dumps([app.version, parts], sort_keys=True, default=str)
+    return '"' + hashlib.sha1(canonical.encode()).hexdigest() + '"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether the If-None-Match header of a GET request names the current ETag"""
+    if request.method not in ("GET", "HEAD"):
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses weak comparison
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": DATA_CACHE_CONTROL}
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=cache_headers(etag))
 
 # Dependency functions
-def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -422,17 +754,17 @@ def get_current_user(token: str = Depends(oauth2_scheme)) -> UserInDB:
     except JWTError:
         raise credentials_exception
     
-    user = get_user_by_username(username=token_data.username)
+    user = await get_cached_user_by_username(username=token_data.username)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_active_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
+async def get_current_active_user(current_user: UserInDB = Depends(get_current_user)) -> UserInDB:
     if current_user.disabled:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
-def get_admin_user(current_user: UserInDB = Depends(get_current_active_user)) -> UserInDB:
+async def get_admin_user(current_user: UserInDB = Depends(get_current_active_user)) -> UserInDB:
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return current_user
@@ -445,7 +777,7 @@ async def login_for_access_token(
     password: str = Form(...)
 ):
     """Login endpoint - returns JWT token"""
-    user = authenticate_user(username, password)
+    user = await authenticate_user(username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -453,7 +785,7 @@ async def login_for_access_token(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    update_user_last_login(user.username)
+    await update_user_last_login(user.username)
     
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
@@ -466,7 +798,7 @@ async def login_for_access_token(
 async def register_new_user(user_data: RegisterRequest):
     """Register a new user"""
     try:
-        user = register_user(user_data)
+        user = await register_user(user_data)
         return user
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -495,10 +827,10 @@ async def change_password(
 ):
     """Change user's password"""
     from auth import verify_password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await asyncio.to_thread(verify_password, password_data.current_password, current_user.hashed_password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     
-    update_user_password(current_user.username, password_data.new_password)
+    await update_user_password(current_user.username, password_data.new_password)
     return {"message": "Password updated successfully"}
 
 # ==================== USER MANAGEMENT ENDPOINTS ====================
@@ -513,11 +845,11 @@ async def get_users(
 ):
     """Get all users with optional filtering (admin only)"""
     if search:
-        users = search_users(search, skip, limit)
+        users = await search_users(search, skip, limit)
     elif role:
-        users = get_users_by_role(role, skip, limit)
+        users = await get_users_by_role(role, skip, limit)
     else:
-        users = get_all_users(skip, limit)
+        users = await get_all_users(skip, limit)
     return users
 
 @app.get("/admin/users/{username}", response_model=UserResponse)
@@ -526,7 +858,7 @@ async def get_user(
     admin: UserInDB = Depends(get_admin_user)
 ):
     """Get user by username (admin only)"""
-    user = get_user_by_username(username)
+    user = await get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return UserResponse(
@@ -549,7 +881,7 @@ async def create_new_user(
     """Create a new user (admin only)"""
     try:
         user_create = UserCreate(**user_data.dict())
-        user = create_user(user_create)
+        user = await create_user(user_create)
         return user
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -564,7 +896,7 @@ async def update_user_info(
 ):
     """Update user information (admin only)"""
     try:
-        updated_user = update_user(username, user_update)
+        updated_user = await update_user(username, user_update)
         if not updated_user:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -593,14 +925,15 @@ async def disable_user(
     if username == admin.username:
         raise HTTPException(status_code=400, detail="Cannot disable your own account")
     
-    user = get_user_by_username(username)
+    user = await get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    users_collection.update_one(
+    await users_collection.update_one(
         {"username": username},
         {"$set": {"disabled": True, "updated_at": datetime.utcnow()}}
     )
+    invalidate_cached_user(username)
     return {"message": f"User {username} disabled"}
 
 @app.put("/admin/users/{username}/enable")
@@ -609,14 +942,15 @@ async def enable_user(
     admin: UserInDB = Depends(get_admin_user)
 ):
     """Enable a user (admin only)"""
-    user = get_user_by_username(username)
+    user = await get_user_by_username(username)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    users_collection.update_one(
+    await users_collection.update_one(
         {"username": username},
         {"$set": {"disabled": False, "updated_at": datetime.utcnow()}}
     )
+    invalidate_cached_user(username)
     return {"message": f"User {username} enabled"}
 
 @app.delete("/admin/users/{username}")
@@ -628,7 +962,7 @@ async def delete_user_account(
     if username == admin.username:
         raise HTTPException(status_code=400, detail="Cannot delete your own account")
     
-    success = delete_user(username)
+    success = await delete_user(username)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
     
@@ -639,17 +973,179 @@ async def get_available_roles(admin: UserInDB = Depends(get_admin_user)):
     """Get list of available roles (admin only)"""
     return {"roles": ROLES}
 
+@app.get("/admin/cache-stats")
+async def get_cache_stats(admin: UserInDB = Depends(get_admin_user)):
+    """Get hit/miss counters of the in-process caches (admin only)"""
+    return {"caches": [
+        dataframe_cache.stats(), analysis_cache.stats(), designator_index_cache.stats(), principal_cache.stats(),
+        {"name": "upload_dedup", **upload_dedup_stats()}
+    ]}
+
+@app.get("/admin/worker-stats")
+async def get_worker_stats(admin: UserInDB = Depends(get_admin_user)):
+    """Get queue depth and per-stage timings of the CPU worker pool (admin only)"""
+    return worker_stats()
+
+# ==================== UPLOAD JOBS ====================
+
+def upload_result(message: str, record: dict, diff_summary: Optional[dict], dedup: dict, timings: dict) -> dict:
+    """Result of an excel_upload job, as returned by /jobs/{job_id}"""
+    return {
+        "message": message,
+        "file_id": record["_id"],
+        "record_count": record["record_count"],
+        "sheet_name": record["sheet_name"],
+        "stored_size": record["file_size"],
+        "version": record["version"],
+        "diff": diff_summary,
+        "dedup": dedup,
+        "board_id": record["board_id"],
+        "board_name": record["board_name"],
+        "timings": timings
+    }
+
+async def run_excel_upload(job: dict, progress: JobProgress) -> dict:
+    """
+    Parse, deduplicate, index and store an Excel upload spooled by
+    /upload/board/{board_id}/excel-to-db. An attempt interrupted by a
+    restart is picked up again: rows it had stored for a record never
+    inserted are dropped first.
+    """
+    params = job["params"]
+    board_id, file_type = params["board_id"], params["file_type"]
+    started = time.perf_counter()
+    
+    interrupted_file_id = (job.get("progress") or {}).get("file_id")
+    if interrupted_file_id:
+        stored = await excel_files_collection.find_one({"_id": interrupted_file_id}, projection={"data": 0})
+        if stored is not None:
+            return upload_result("Excel file uploaded and stored in database successfully", stored, None,
+                                 {"match": None, "file_id": None, "alias": False, **upload_dedup_stats()}, {})
+        await delete_chunks([interrupted_file_id])
+    
+    if not os.path.exists(params["_spool_path"]):
+        raise HTTPException(status_code=410, detail="The uploaded file is no longer available, please upload it again")
+    
+    # A byte-identical re-upload of a stored version is neither parsed nor stored again
+    await progress.stage("deduplicating")
+    existing = await find_duplicate_record(board_id, file_type, "upload_hash", params["upload_hash"])
+    match = "upload" if existing is not None else None
+    parse_seconds = 0.0
+    if existing is None:
+        # Parse on the worker pool so other requests keep being served
+        await progress.stage("parsing")
+        parse_start = time.perf_counter()
+        parsed = await run_cpu_task("excel_parse", parse_excel_upload, params["_spool_path"], file_type)
+        parse_seconds = time.perf_counter() - parse_start
+        
+        # Nor is one that parses to the same sheet (e.g. the workbook saved again)
+        existing = await find_duplicate_record(board_id, file_type, "data_hash", parsed["data_hash"])
+        match = "data" if existing is not None else None
+    record_upload_dedup(match)
+    
+    if existing is not None:
+        record, alias_added, diff_summary = await reuse_stored_version(
+            existing, params["filename"], params["file_size"], params["upload_hash"], params["uploaded_by"]
+        )
+        return upload_result(
+            "Excel file matches a stored version and was recorded as a new version sharing its data"
+            if alias_added else "Excel file matches the latest stored version, nothing stored",
+            record, diff_summary,
+            {"match": match, "file_id": existing["_id"], "alias": alias_added, **upload_dedup_stats()},
+            {"parse_seconds": round(parse_seconds, 3), "total_seconds": round(time.perf_counter() - started, 3)}
+        )
+    
+    # Get version number (increment from previous version)
+    latest_version = await excel_files_collection.find_one(
+        {"board_id": board_id, "file_type": file_type},
+        sort=[("version", -1)]
+    )
+    
+    version = 1
+    if latest_version and "version" in latest_version:
+        version = latest_version["version"] + 1
+    
+    # Generate unique ID (saved on the job so a restart can clean up after this attempt)
+    file_id = str(uuid.uuid4())
+    record_count = stored_row_count(parsed["data"])
+    await progress.stage("storing", file_id=file_id, rows_total=record_count, rows_stored=0)
+    
+    async def rows_stored(count: int):
+        await progress.update(rows_stored=count)
+    
+    # Rows go to excel_chunks so large sheets stay under the BSON document limit
+    store_start = time.perf_counter()
+    data_meta = await save_chunks(file_id, parsed.pop("data"), rows_stored)
+    await progress.stage("indexing")
+    await save_designator_index(file_id, parsed["designator_index"])
+    await save_row_index(file_id, parsed["row_index"])
+    
+    # Prepare document for MongoDB
+    excel_record = {
+        "_id": file_id,
+        "board_id": board_id,
+        "board_name": BOARD_CONFIG[board_id]["name"],
+        "file_type": file_type,
+        "original_filename": params["filename"],
+        "sheet_name": parsed["sheet_name"],
+        "column_roles": parsed["column_roles"],
+        "stored_filename": f"{file_id}.json",
+        "file_size": params["file_size"],
+        "record_count": record_count,
+        "storage_format": STORAGE_FORMAT_VERSION,
+        "data": data_meta,
+        "upload_hash": params["upload_hash"],
+        "data_hash": parsed["data_hash"],
+        "upload_date": datetime.utcnow(),
+        "uploaded_by": params["uploaded_by"],
+        "version": version
+    }
+    
+    # Save to MongoDB
+    try:
+        await excel_files_collection.insert_one(excel_record)
+    except Exception:
+        await delete_chunks([file_id])
+        raise
+    invalidate_board_caches(board_id, file_type)
+    store_seconds = time.perf_counter() - store_start
+    
+    # Rows added / removed / changed since the previous version, for /board/{board_id}/diff
+    await progress.stage("diffing")
+    diff_summary = await diff_against_previous(latest_version, excel_record, parsed["row_index"])
+    
+    return upload_result(
+        "Excel file uploaded and stored in database successfully", excel_record, diff_summary,
+        {"match": None, "file_id": None, "alias": False, **upload_dedup_stats()},
+        {
+            "parse_seconds": round(parse_seconds, 3),
+            "store_seconds": round(store_seconds, 3),
+            "total_seconds": round(time.perf_counter() - started, 3)
+        }
+    )
+
+async def finish_excel_upload(job: dict):
+    """Remove the spooled upload once its job is done or failed"""
+    spool_path = job["params"]["_spool_path"]
+    if os.path.exists(spool_path):
+        os.unlink(spool_path)
+
+register_job_handler("excel_upload", run_excel_upload, finish_excel_upload)
+
 # ==================== EXCEL TO DATABASE UPLOAD ENDPOINTS ====================
 
-@app.post("/upload/board/{board_id}/excel-to-db")
+@app.post("/upload/board/{board_id}/excel-to-db", status_code=status.HTTP_202_ACCEPTED)
 async def upload_excel_to_database(
     board_id: int,
     file_type: str = Form(...),  # "fmeca" or "coverage"
     file: UploadFile = File(...),
+    wait: bool = Form(False),    # Hold the request until the job finishes and return its result
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
-    Upload Excel file and store its data in MongoDB as JSON
+    Upload Excel file and store its data in MongoDB as JSON. The file is
+    spooled to disk and queued as a background job; the response is the
+    job (poll /jobs/{job_id} for its stage, progress and result).
     """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can upload files")
@@ -664,87 +1160,54 @@ async def upload_excel_to_database(
     if file_type not in ["fmeca", "coverage"]:
         raise HTTPException(status_code=400, detail="file_type must be 'fmeca' or 'coverage'")
     
+    # Spool the upload to disk instead of holding it in memory
+    spool_path, file_size, upload_hash = await spool_upload(file, UPLOAD_JOB_DIR)
     try:
-        # Read Excel file
-        contents = await file.read()
-        excel_bytes = io.BytesIO(contents)
-        
-        # Try different sheets based on file type
-        if file_type == "fmeca":
-            sheet_names = ['DFMECA', 'Sheet1', 'FMECA', 'Data']
-        else:  # coverage
-            sheet_names = ['iiGD board', 'Sheet1', 'Coverage', 'Data', 'ATM']
-        
-        df = None
-        
-        for sheet in sheet_names:
-            try:
-                df = pd.read_excel(excel_bytes, sheet_name=sheet)
-                print(f"✅ Loaded from sheet: {sheet}")
-                break
-            except:
-                continue
-        
-        if df is None:
-            excel_bytes.seek(0)  # Reset pointer
-            df = pd.read_excel(excel_bytes)
-            print("✅ Loaded from first available sheet")
-        
-        # Fill NaN values
-        df = df.ffill()
-        
-        # Convert DataFrame to structured dictionary
-        data_dict = {
-            "columns": df.columns.tolist(),
-            "data": df.replace({pd.NaT: None, np.nan: None}).to_dict(orient='records'),
-            "dtypes": {col: str(df[col].dtype) for col in df.columns},
-            "shape": df.shape
-        }
-        
-        # Get version number (increment from previous version)
-        latest_version = excel_files_collection.find_one(
-            {"board_id": board_id, "file_type": file_type},
-            sort=[("version", -1)]
-        )
-        
-        version = 1
-        if latest_version and "version" in latest_version:
-            version = latest_version["version"] + 1
-        
-        # Generate unique ID
-        file_id = str(uuid.uuid4())
-        
-        # Prepare document for MongoDB
-        excel_record = {
-            "_id": file_id,
+        job = await submit_job("excel_upload", {
             "board_id": board_id,
-            "board_name": board_config["name"],
             "file_type": file_type,
-            "original_filename": file.filename,
-            "stored_filename": f"{file_id}.json",
-            "file_size": len(contents),
-            "data": data_dict,
-            "upload_date": datetime.utcnow(),
+            "filename": file.filename,
+            "file_size": file_size,
+            "upload_hash": upload_hash,
             "uploaded_by": current_user.username,
-            "version": version
-        }
-        
-        # Save to MongoDB
-        result = excel_files_collection.insert_one(excel_record)
-        
-        return {
-            "message": "Excel file uploaded and stored in database successfully",
-            "file_id": file_id,
-            "record_count": len(data_dict["data"]),
-            "stored_size": len(contents),
-            "version": version,
-            "board_id": board_id,
-            "board_name": board_config["name"]
-        }
-        
+            "_spool_path": spool_path
+        }, current_user.username)
     except Exception as e:
-        print(f"❌ Error uploading Excel to DB: {e}")
-        raise HTTPException(status_code=500, detail=f"Failed to process Excel file: {str(e)}")
+        os.unlink(spool_path)
+        print(f"❌ Error queueing Excel upload: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue Excel file: {str(e)}")
+    
+    if not wait:
+        return {**job_report(job), "status_url": f"/jobs/{job['_id']}"}
+    
+    job_id = job["_id"]
+    job = await wait_for_job(job_id)
+    if job is None:
+        # Deleted while we waited (by hand, or by the retention TTL index)
+        raise HTTPException(status_code=500, detail=f"Upload job {job_id} vanished before it finished")
+    if job["status"] == "failed":
+        raise HTTPException(status_code=500, detail=f"Failed to process Excel file: {job['error']}")
+    return FastJSONResponse(job["result"], status_code=status.HTTP_200_OK)
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(
+    job_id: str,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Get the status of a background job: "queued", "running", "done" or
+    "failed", its current stage with progress (rows_total / rows_stored
+    while storing) and an estimate of the seconds left in that stage,
+    and the result once done (the upload response) or the error.
+    """
+    job = await get_job(job_id)
+    if job is None or (current_user.role != "admin" and job["submitted_by"] != current_user.username):
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    bytes_per_second = None
+    if job["status"] == "running" and job["progress"].get("stage") == "parsing":
+        bytes_per_second = await parse_rate(job["kind"])
+    return job_report(job, bytes_per_second)
 
 @app.get("/get/excel-data/{board_id}")
 async def get_excel_data_from_db(
@@ -752,10 +1215,12 @@ async def get_excel_data_from_db(
     file_type: Optional[str] = None,  # Optional: "fmeca" or "coverage"
     version: Optional[int] = None,    # Optional: specific version
     limit: int = 100,                  # Limit records
+    include_data: bool = False,        # Embed every row of every version (use /rows instead)
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
-    Get Excel data from MongoDB for a specific board
+    Get the stored Excel versions of a board (metadata only unless
+    include_data is set; rows are paged by /get/excel-data/{board_id}/rows)
     """
     query = {"board_id": board_id}
     if file_type:
@@ -768,7 +1233,9 @@ async def get_excel_data_from_db(
     # Get latest version if not specified
     sort_order = [("upload_date", -1)]
     
-    records = list(excel_files_collection.find(query).sort(sort_order).limit(limit))
+    # Inline rows of older records are only fetched when they are returned
+    projection = None if include_data else {"data.arrays": 0, "data.data": 0}
+    records = await excel_files_collection.find(query, projection=projection).sort(sort_order).limit(limit).to_list(length=None)
     
     if not records:
         raise HTTPException(status_code=404, detail="No Excel data found for this board")
@@ -776,22 +1243,26 @@ async def get_excel_data_from_db(
     # Convert to response format
     response_data = []
     for record in records:
-        # Limit data size for response
-        data = record["data"]
-        record_count = len(data["data"]) if isinstance(data, dict) and "data" in data else len(data)
+        record_count = record.get("record_count")
+        if record_count is None:
+            record_count = stored_row_count(record["data"])
         
-        response_data.append({
+        version_info = {
             "id": record["_id"],
             "board_id": record["board_id"],
             "board_name": record["board_name"],
             "file_type": record["file_type"],
             "original_filename": record["original_filename"],
+            "sheet_name": record.get("sheet_name"),
             "upload_date": record["upload_date"],
             "uploaded_by": record["uploaded_by"],
             "version": record.get("version", 1),
             "record_count": record_count,
-            "data": data  # The actual JSON data
-        })
+            "columns": stored_column_names(record["data"])
+        }
+        if include_data:
+            version_info["data"] = stored_data_to_records(await load_stored_data(record))  # The actual JSON data
+        response_data.append(version_info)
     
     return {
         "count": len(response_data),
@@ -799,6 +1270,105 @@ async def get_excel_data_from_db(
         "data": response_data
     }
 
+@app.get("/get/excel-data/{board_id}/rows")
+async def get_excel_rows_from_db(
+    board_id: int,
+    file_type: str,
+    version: Optional[int] = None,     # Default: latest version
+    columns: Optional[str] = None,     # Comma-separated column names (default: all)
+    cursor: int = 0,                   # Row to start from (next_cursor of the previous page)
+    limit: int = EXCEL_ROWS_DEFAULT_LIMIT,
+    format: str = "json",              # "json", "ndjson" or "columnar"
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Page through the rows of one stored Excel version. The body is streamed
+    chunk by chunk, so memory stays flat whatever the page size. "json"
+    returns {"file_id", "version", "columns", "total_rows", "cursor",
+    "next_cursor", "rows": [...]}; "ndjson" returns one row object per
+    line with the paging fields in X-* headers; "columnar" returns the
+    "json" fields with "data": {column: values} in place of "rows" (the
+    page is collected before it is sent). Pass the returned version with
+    next_cursor to keep paging the same upload.
+    """
+    if file_type not in ["fmeca", "coverage"]:
+        raise HTTPException(status_code=400, detail="file_type must be 'fmeca' or 'coverage'")
+    if format not in ["json", "ndjson", "columnar"]:
+        raise HTTPException(status_code=400, detail="format must be 'json', 'ndjson' or 'columnar'")
+    if cursor < 0 or limit < 1 or limit > EXCEL_ROWS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"cursor must be >= 0 and limit between 1 and {EXCEL_ROWS_MAX_LIMIT}")
+    
+    query = {"board_id": board_id, "file_type": file_type}
+    if version:
+        query["version"] = version
+    record = await excel_files_collection.find_one(query, sort=[("upload_date", -1)])
+    if not record:
+        raise HTTPException(status_code=404, detail="No Excel data found for this board")
+    
+    stored_columns = stored_column_names(record["data"])
+    selected_columns = [column.strip() for column in columns.split(",")] if columns else stored_columns
+    # Column names are matched as text, since query parameters are strings
+    columns_by_name = {str(column): column for column in stored_columns}
+    unknown = [column for column in selected_columns if str(column) not in columns_by_name]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown columns: {', '.join(map(str, unknown))}")
+    selected_columns = [columns_by_name[str(column)] for column in selected_columns]
+    
+    total_rows = record.get("record_count")
+    if total_rows is None:
+        total_rows = stored_row_count(record["data"])
+    stop = min(cursor + limit, total_rows)
+    next_cursor = stop if stop < total_rows else None
+    
+    keys = [str(column) for column in selected_columns]
+    
+    async def row_lines():
+        async for batch in iter_stored_rows(record, selected_columns, cursor, stop):
+            yield b"".join(json_bytes(dict(zip(keys, row)), newline=True) for row in batch)
+    
+    header = json_bytes({
+        "file_id": record["_id"],
+        "version": record.get("version", 1),
+        "columns": keys,
+        "total_rows": total_rows,
+        "cursor": cursor,
+        "next_cursor": next_cursor
+    })
+    
+    async def json_body():
+        yield header[:-1] + b',"rows":['
+        first = True
+        async for batch in iter_stored_rows(record, selected_columns, cursor, stop):
+            if not batch:
+                continue
+            rows_json = json_bytes([dict(zip(keys, row)) for row in batch])[1:-1]
+            yield rows_json if first else b"," + rows_json
+            first = False
+        yield b"]}"
+    
+    async def columnar_body():
+        values = [[] for _ in keys]
+        async for batch in iter_stored_rows(record, selected_columns, cursor, stop):
+            for column_values, batch_values in zip(values, zip(*batch)):
+                column_values.extend(batch_values)
+        yield header[:-1] + b',"data":{'
+        for position, key in enumerate(keys):
+            prefix = b"" if position == 0 else b","
+            yield prefix + json_bytes(key) + b":" + json_bytes(values[position])
+        yield b"}}"
+    
+    headers = {
+        "X-File-Id": str(record["_id"]),
+        "X-Version": str(record.get("version", 1)),
+        "X-Total-Rows": str(total_rows),
+        "X-Next-Cursor": "" if next_cursor is None else str(next_cursor)
+    }
+    if format == "ndjson":
+        return StreamingResponse(row_lines(), media_type="application/x-ndjson", headers=headers)
+    if format == "columnar":
+        return StreamingResponse(columnar_body(), media_type="application/json", headers=headers)
+    return StreamingResponse(json_body(), media_type="application/json", headers=headers)
+
 @app.delete("/delete/excel-data/{file_id}")
 async def delete_excel_data(
     file_id: str,
@@ -810,16 +1380,24 @@ async def delete_excel_data(
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can delete data")
     
-    result = excel_files_collection.delete_one({"_id": file_id})
+    deleted = await excel_files_collection.find_one_and_delete(
+        {"_id": file_id},
+        projection={"board_id": 1, "file_type": 1, "data_file_id": 1}
+    )
     
-    if result.deleted_count == 0:
+    if deleted is None:
         raise HTTPException(status_code=404, detail="File not found")
     
+    await release_stored_data(deleted)
+    invalidate_board_caches(deleted["board_id"], deleted["file_type"])
+    
     return {"message": "Excel data deleted successfully", "file_id": file_id}
 
 @app.get("/board/{board_id}/db-status")
 async def get_board_db_status(
     board_id: int,
+    request: Request,
+    response: Response,
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """
@@ -829,36 +1407,119 @@ async def get_board_db_status(
     if not board_config:
         raise HTTPException(status_code=404, detail="Board not found")
     
-    # Get latest records for both file types
-    fmeca_record = excel_files_collection.find_one(
-        {"board_id": board_id, "file_type": "fmeca"},
-        sort=[("upload_date", -1)]
-    )
+    # Get latest record info for both file types in one aggregation
+    file_status = (await get_board_file_status([board_id]))[board_id]
+    fmeca_info = file_status.get("fmeca")
+    coverage_info = file_status.get("coverage")
     
-    coverage_record = excel_files_collection.find_one(
-        {"board_id": board_id, "file_type": "coverage"},
-        sort=[("upload_date", -1)]
-    )
+    etag = data_etag("db-status", board_id, board_config, file_status)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
     
     return {
         "board_id": board_id,
         "board_name": board_config["name"],
-        "fmeca_in_db": fmeca_record is not None,
-        "coverage_in_db": coverage_record is not None,
+        "fmeca_in_db": fmeca_info is not None,
+        "coverage_in_db": coverage_info is not None,
         "fmeca_info": {
-            "upload_date": fmeca_record["upload_date"] if fmeca_record else None,
-            "uploaded_by": fmeca_record["uploaded_by"] if fmeca_record else None,
-            "version": fmeca_record.get("version", 1) if fmeca_record else None,
-            "record_count": len(fmeca_record["data"]["data"]) if fmeca_record and "data" in fmeca_record else None
-        } if fmeca_record else None,
+            "upload_date": fmeca_info["upload_date"],
+            "uploaded_by": fmeca_info["uploaded_by"],
+            "version": fmeca_info["version"],
+            "record_count": fmeca_info["record_count"]
+        } if fmeca_info else None,
         "coverage_info": {
-            "upload_date": coverage_record["upload_date"] if coverage_record else None,
-            "uploaded_by": coverage_record["uploaded_by"] if coverage_record else None,
-            "version": coverage_record.get("version", 1) if coverage_record else None,
-            "record_count": len(coverage_record["data"]["data"]) if coverage_record and "data" in coverage_record else None
-        } if coverage_record else None
+            "upload_date": coverage_info["upload_date"],
+            "uploaded_by": coverage_info["uploaded_by"],
+            "version": coverage_info["version"],
+            "record_count": coverage_info["record_count"]
+        } if coverage_info else None
     }
 
+@app.get("/board/{board_id}/diff")
+async def get_board_diff(
+    board_id: int,
+    request: Request,
+    file_type: str,
+    from_version: Optional[int] = Query(None, alias="from"),  # Default: the version before "to"
+    to_version: Optional[int] = Query(None, alias="to"),      # Default: latest version
+    limit: int = DIFF_ROWS_DEFAULT_LIMIT,                      # Rows returned of each kind
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    Rows added, removed and changed between two stored versions of a
+    board's sheet. Rows are matched by the FMECA ID / coverage CRD column
+    (by content alone for sheets without one). Counts cover the whole
+    diff; up to limit rows of each kind are returned, with the changed
+    cells of changed rows. Served from the diff stored at upload (or the
+    row indexes of both versions), reading only the chunks holding the
+    returned rows.
+    """
+    if file_type not in ["fmeca", "coverage"]:
+        raise HTTPException(status_code=400, detail="file_type must be 'fmeca' or 'coverage'")
+    if limit < 0 or limit > EXCEL_ROWS_MAX_LIMIT:
+        raise HTTPException(status_code=400, detail=f"limit must be between 0 and {EXCEL_ROWS_MAX_LIMIT}")
+    if from_version is not None and to_version is not None and from_version >= to_version:
+        raise HTTPException(status_code=400, detail="from must be an earlier version than to")
+    
+    new_record = await find_version_record(board_id, file_type, to_version)
+    if not new_record:
+        raise HTTPException(status_code=404, detail="No Excel data found for this version")
+    new_version = new_record.get("version", 1)
+    if from_version is not None and from_version >= new_version:
+        raise HTTPException(status_code=400, detail="from must be an earlier version than to")
+    old_record = await find_version_record(board_id, file_type, from_version, before_version=new_version)
+    if not old_record:
+        raise HTTPException(status_code=404, detail="No earlier version to compare with")
+    
+    etag = data_etag("diff", old_record["_id"], new_record["_id"], limit)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    diff = await load_row_diff(old_record["_id"], new_record["_id"])
+    if diff is None:
+        new_index = await get_row_index(new_record)
+        diff = await run_cpu_task("row_diff", diff_row_indexes, await get_row_index(old_record), new_index)
+        diff["key_column"] = new_index["key_column"]
+    
+    added = diff["added"][:limit]
+    removed = diff["removed"][:limit]
+    changed = diff["changed"][:limit]
+    old_rows = await load_stored_rows_at(old_record, removed + [old for old, _ in changed])
+    new_rows = await load_stored_rows_at(new_record, added + [new for _, new in changed])
+    old_columns = [str(column) for column in stored_column_names(old_record["data"])]
+    new_columns = [str(column) for column in stored_column_names(new_record["data"])]
+    all_columns = new_columns + [column for column in old_columns if column not in new_columns]
+    key_column = diff["key_column"]
+    
+    changed_rows = []
+    for old, new in changed:
+        before = dict(zip(old_columns, old_rows[old]))
+        after = dict(zip(new_columns, new_rows[new]))
+        changed_rows.append({
+            "key": after.get(str(key_column)) if key_column is not None else None,
+            "from_row": old,
+            "to_row": new,
+            "changes": {
+                column: [before.get(column), after.get(column)]
+                for column in all_columns if before.get(column) != after.get(column)
+            }
+        })
+    
+    result = {
+        "board_id": board_id,
+        "file_type": file_type,
+        "key_column": key_column,
+        "from": {"file_id": old_record["_id"], "version": old_record.get("version", 1)},
+        "to": {"file_id": new_record["_id"], "version": new_version},
+        "counts": diff_counts(diff),
+        "added": [{"row": row, "values": dict(zip(new_columns, new_rows[row]))} for row in added],
+        "removed": [{"row": row, "values": dict(zip(old_columns, old_rows[row]))} for row in removed],
+        "changed": changed_rows,
+        "truncated": any(len(diff[kind]) > limit for kind in ("added", "removed", "changed"))
+    }
+    return FastJSONResponse(result, headers=cache_headers(etag))
+
 # ==================== FILE UPLOAD ENDPOINTS ====================
 
 @app.post("/upload/board/{board_id}/fmeca")
@@ -867,7 +1528,10 @@ async def upload_fmeca_file(
     file: UploadFile = File(...),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
-    """Upload FMECA Excel file for a board (to database only)"""
+    """
+    Upload FMECA Excel file for a board (to database only). Kept for
+    older clients: waits for the upload job and returns its result.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can upload files")
     
@@ -883,6 +1547,7 @@ async def upload_fmeca_file(
         board_id=board_id,
         file_type="fmeca",
         file=file,
+        wait=True,
         current_user=current_user
     )
 
@@ -892,7 +1557,10 @@ async def upload_coverage_file(
     file: UploadFile = File(...),
     current_user: UserInDB = Depends(get_current_active_user)
 ):
-    """Upload coverage Excel file for a board (to database only)"""
+    """
+    Upload coverage Excel file for a board (to database only). Kept for
+    older clients: waits for the upload job and returns its result.
+    """
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Only admin can upload files")
     
@@ -908,6 +1576,7 @@ async def upload_coverage_file(
         board_id=board_id,
         file_type="coverage",
         file=file,
+        wait=True,
         current_user=current_user
     )
 
@@ -921,7 +1590,7 @@ async def get_board_file_info(
     if not board_config:
         raise HTTPException(status_code=404, detail="Board not found")
     
-    file_info = check_board_files(board_id)
+    file_info = await check_board_files(board_id)
     
     return BoardFileInfo(
         board_id=board_id,
@@ -945,14 +1614,26 @@ async def root():
     }
 
 @app.get("/boards", response_model=List[BoardInfo])
-async def get_boards(current_user: UserInDB = Depends(get_current_active_user)):
+async def get_boards(
+    request: Request,
+    response: Response,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
     """Get all boards with file status (database only)"""
     print("🎯 /boards API called")
     boards = []
+    file_status = await get_board_file_status()
+    
+    # The board list only shows which file types are stored
+    etag = data_etag("boards", BOARD_CONFIG, {board_id: sorted(status) for board_id, status in file_status.items()})
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    response.headers.update(cache_headers(etag))
+    
     for board_id, board_config in BOARD_CONFIG.items():
         print(f"🔍 Processing board: {board_config['name']} (ID: {board_id})")
         
-        file_info = check_board_files(board_id)
+        file_info = await check_board_files(board_id, file_status[board_id])
         image_data = load_board_image(board_id)
         
         boards.append(BoardInfo(
@@ -969,216 +1650,243 @@ async def get_boards(current_user: UserInDB = Depends(get_current_active_user)):
     print("✅ All boards processed successfully")
     return boards
 
+async def timed_seconds(awaitable) -> float:
+    start = time.perf_counter()
+    await awaitable
+    return round(time.perf_counter() - start, 4)
+
+async def analyze_portfolio_board(board_id: int, record_keys: tuple, semaphore: asyncio.Semaphore) -> dict:
+    """Summary of one board for /portfolio, with where its time went"""
+    fmeca_key, coverage_key = record_keys
+    result = {
+        "board_id": board_id,
+        "board_name": BOARD_CONFIG[board_id]["name"],
+        "fmeca_version": fmeca_key[0] if fmeca_key else None,
+        "coverage_version": coverage_key[0] if coverage_key else None
+    }
+    if not fmeca_key or not coverage_key:
+        result["message"] = "FMECA and coverage data are both needed"
+        return result
+    
+    async with semaphore:
+        start = time.perf_counter()
+        timings = {}
+        try:
+            # One analysis (and one load of each sheet) serves both the join and the ATM check
+            analysis = await get_board_analysis(board_id, record_keys)
+            timings["load_seconds"] = round(time.perf_counter() - start, 4)
+            
+            if analysis.fmeca_df.empty or analysis.coverage_df.empty:
+                result["message"] = "No data found in database"
+            else:
+                timings["coverage_join_seconds"], timings["atm_check_seconds"] = await asyncio.gather(
+                    timed_seconds(analysis.joined()), timed_seconds(analysis.missing_components())
+                )
+                result.update(await analysis.summary())
+        except HTTPException as e:
+            result["error"] = e.detail
+        except Exception as e:
+            print(f"❌ Error in portfolio analysis of board {board_id}: {e}")
+            result["error"] = str(e)
+        timings["total_seconds"] = round(time.perf_counter() - start, 4)
+    
+    result["timings"] = timings
+    return result
+
+@app.get("/portfolio")
+async def get_portfolio(
+    request: Request,
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    RPN bucket counts, coverage percentage and missing designator count of
+    every board in one response. Boards are analyzed concurrently (at most
+    PORTFOLIO_CONCURRENCY at a time) and share the analysis cache with
+    /fmeca-data and /atm-check.
+    """
+    print("💼 Portfolio analysis requested")
+    start = time.perf_counter()
+    
+    board_ids = list(BOARD_CONFIG.keys())
+    record_keys = await asyncio.gather(*(get_board_record_keys(board_id) for board_id in board_ids))
+    
+    etag = data_etag("portfolio", dict(zip(board_ids, record_keys)))
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
+    semaphore = asyncio.Semaphore(PORTFOLIO_CONCURRENCY)
+    boards = await asyncio.gather(*(
+        analyze_portfolio_board(board_id, keys, semaphore) for board_id, keys in zip(board_ids, record_keys)
+    ))
+    
+    analyzed = [board for board in boards if "rows" in board]
+    rows = sum(board["rows"] for board in analyzed)
+    covered = sum(board["covered_rows"] for board in analyzed)
+    totals = {
+        "boards_analyzed": len(analyzed),
+        "rows": rows,
+        "rpn_buckets": {
+            filter_type: sum(board["rpn_buckets"][filter_type] for board in analyzed) for filter_type in RPN_FILTERS
+        },
+        "covered_rows": covered,
+        "coverage_percent": round(100 * covered / rows, 1) if rows else None,
+        "missing_designators": sum(board["missing_designators"] for board in analyzed)
+    }
+    
+    # A portfolio with failed boards must not be revalidated as current
+    failed = any("error" in board for board in boards)
+    return FastJSONResponse(
+        {"boards": boards, "totals": totals, "elapsed_seconds": round(time.perf_counter() - start, 4)},
+        headers=None if failed else cache_headers(etag)
+    )
+
 @app.post("/fmeca-data/{board_id}")
 async def get_fmeca_data(
     board_id: int, 
     filter_request: FilterRequest,
+    request: Request,
+    response: Response,
     current_user: UserInDB = Depends(get_current_active_user)
 ):
-    """Get FMECA data for a board with filtering (from database only)"""
+    """
+    Get FMECA data for a board with filtering (from database only).
+    offset/limit page through the RPN-sorted rows; stream=true sends them
+    as NDJSON while they are being built.
+    """
+    if filter_request.offset < 0 or (filter_request.limit is not None and filter_request.limit < 1):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1")
+    if filter_request.format not in ["json", "columnar"]:
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'columnar'")
+    if filter_request.stream and filter_request.format != "json":
+        raise HTTPException(status_code=400, detail="Only the json format can be streamed")
+    
+    filter_type = filter_request.filter_type
+    offset, limit = filter_request.offset, filter_request.limit
+    
+    # Answered from the latest record keys alone when the client has this version
+    record_keys = await get_board_record_keys(board_id)
+    etag = data_etag(
+        "fmeca-data", board_id, record_keys, filter_type, offset, limit, filter_request.stream, filter_request.format
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     try:
-        print(f"📊 FMECA data requested for board {board_id} with filter {filter_request.filter_type}")
+        print(f"📊 FMECA data requested for board {board_id} with filter {filter_type}")
         
-        df = load_main_data(board_id)
-        ref_df = load_reference_data(board_id)
+        analysis = await get_board_analysis(board_id, record_keys)
         
-        if df.empty:
+        if analysis.fmeca_df.empty:
+            response.headers.update(cache_headers(etag))
             return {"data": [], "count": 0, "message": "No FMECA data found in database"}
         
-        if ref_df.empty:
+        if analysis.coverage_df.empty:
+            response.headers.update(cache_headers(etag))
             return {"data": [], "count": 0, "message": "No coverage data found in database"}
         
-        # Find relevant columns
-        id_col = None
-        component_col = None
-        designator_col = None
-        rpn_col = None
-        
-        for col in df.columns:
-            col_lower = str(col).lower()
-            if 'id' in col_lower and not id_col:
-                id_col = col
-            elif 'component' in col_lower and not component_col:
-                component_col = col
-            elif 'reference' in col_lower and 'designator' in col_lower and not designator_col:
-                designator_col = col
-            elif 'rpn' in col_lower and not rpn_col:
-                rpn_col = col
-        
-        if not all([id_col, component_col, designator_col, rpn_col]):
-            cols = df.columns.tolist()
-            if len(cols) >= 4:
-                id_col = cols[0] if not id_col else id_col
-                component_col = cols[1] if not component_col else component_col
-                designator_col = cols[2] if not designator_col else designator_col
-                rpn_col = cols[3] if not rpn_col else rpn_col
-        
-        print(f"📝 Using columns - ID: {id_col}, Component: {component_col}, Designator: {designator_col}, RPN: {rpn_col}")
-        
-        selected_columns = [id_col, component_col, designator_col, rpn_col]
-        base_df = df[selected_columns].copy()
-        
-        base_df[rpn_col] = pd.to_numeric(base_df[rpn_col], errors='coerce')
-        
-        # Apply filters
-        if filter_request.filter_type == "red":
-            df_filtered = base_df[base_df[rpn_col] >= 70]
-        elif filter_request.filter_type == "orange":
-            df_filtered = base_df[(base_df[rpn_col] < 70) & (base_df[rpn_col] >= 60)]
-        elif filter_request.filter_type == "yellow":
-            df_filtered = base_df[(base_df[rpn_col] < 60) & (base_df[rpn_col] >= 50)]
-        elif filter_request.filter_type == "green":
-            df_filtered = base_df[base_df[rpn_col] < 50]
-        elif filter_request.filter_type == "all":
-            df_filtered = base_df
-        else:
-            df_filtered = base_df
-
-        df_filtered = df_filtered.sort_values(by=rpn_col, ascending=False)
-        
-        df_filtered["ATM Coverage"] = "Not Found"
-        
-        crd_col = None
-        result_col = None
-        
-        for col in ref_df.columns:
-            col_lower = str(col).lower()
-            if 'crd' in col_lower and not crd_col:
-                crd_col = col
-            elif 'result' in col_lower and not result_col:
-                result_col = col
-        
-        if not crd_col or not result_col:
-            ref_cols = ref_df.columns.tolist()
-            if len(ref_cols) >= 2:
-                crd_col = ref_cols[0] if not crd_col else crd_col
-                result_col = ref_cols[1] if not result_col else result_col
+        # Every RPN bucket is a slice of the same memoized join
+        total = await analysis.fmeca_row_count(filter_type)
+        end = total if limit is None else min(total, offset + limit)
+        next_offset = end if end < total else None
         
-        if crd_col and result_col:
-            df_filtered[designator_col] = df_filtered[designator_col].astype(str).str.upper()
-            ref_df[crd_col] = ref_df[crd_col].astype(str).str.upper()
+        if filter_request.stream:
+            async def row_lines():
+                async for batch in analysis.fmeca_row_batches(filter_type, offset, limit, FMECA_STREAM_BATCH_SIZE):
+                    yield b"".join(json_bytes(row, newline=True) for row in batch)
             
-            for _, row in ref_df.iterrows():
-                crd = str(row[crd_col]).strip()
-                result_val = str(row[result_col])
-                
-                crd_designators = extract_complete_designators(crd)
-                
-                for designator in crd_designators:
-                    mask = df_filtered[designator_col].str.contains(re.escape(designator), na=False, regex=True)
-                    df_filtered.loc[mask, "ATM Coverage"] = result_val
-
-        result_data = []
-        for _, row in df_filtered.iterrows():
-            result_data.append({
-                "ID": str(row[id_col]),
-                "Component": str(row[component_col]),
-                "Reference_Designator": str(row[designator_col]),
-                "RPN": str(row[rpn_col]),
-                "ATM_Coverage": str(row["ATM Coverage"])
+            return StreamingResponse(row_lines(), media_type="application/x-ndjson", headers={
+                "X-Total-Count": str(total),
+                "X-Next-Offset": "" if next_offset is None else str(next_offset),
+                **cache_headers(etag)
             })
         
-        return {"data": result_data, "count": len(result_data), "message": f"Found {len(result_data)} records"}
+        if filter_request.format == "columnar":
+            # Each field name once instead of once per row
+            result_data = await analysis.fmeca_columns(filter_type, offset, end)
+            count = max(0, end - offset)
+        else:
+            result_data = (await analysis.fmeca_rows(filter_type))[offset:end]
+            count = len(result_data)
+        
+        result = {"data": result_data, "count": count, "message": f"Found {count} records"}
+        if offset or limit is not None:
+            result.update({"total": total, "offset": offset, "next_offset": next_offset})
+        # Returned as a response so FastAPI doesn't re-encode every row with jsonable_encoder
+        return FastJSONResponse(result, headers=cache_headers(etag))
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error in FMECA data: {e}")
         return {"data": [], "count": 0, "error": str(e)}
 
+@app.get("/fmeca-data/{board_id}")
+async def get_fmeca_data_conditional(
+    board_id: int,
+    request: Request,
+    response: Response,
+    filter_type: str = "all",
+    offset: int = 0,
+    limit: Optional[int] = None,
+    stream: bool = False,
+    format: str = "json",
+    current_user: UserInDB = Depends(get_current_active_user)
+):
+    """
+    GET form of POST /fmeca-data/{board_id} (same fields as query
+    parameters), which browsers revalidate with If-None-Match
+    """
+    filter_request = FilterRequest(
+        board_id=board_id, filter_type=filter_type, offset=offset, limit=limit, stream=stream, format=format
+    )
+    return await get_fmeca_data(board_id, filter_request, request, response, current_user)
+
 @app.get("/atm-check/{board_id}", response_model=ATMResponse)
 async def atm_check(
     board_id: int,
+    request: Request,
+    response: Response,
     current_user: UserInDB = Depends(get_current_active_user)
 ):
     """Perform ATM check for a board (from database only)"""
+    record_keys = await get_board_record_keys(board_id)
+    etag = data_etag("atm-check", board_id, record_keys)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     try:
         print(f"🏧 ATM check requested for board {board_id}")
         
-        df = load_main_data(board_id)
-        ref_df = load_reference_data(board_id)
+        analysis = await get_board_analysis(board_id, record_keys)
         
-        if df.empty or ref_df.empty:
+        if analysis.fmeca_df.empty or analysis.coverage_df.empty:
+            response.headers.update(cache_headers(etag))
             return ATMResponse(
                 missing_components=[],
                 message="No data found in database"
             )
         
-        designator_col = None
-        for col in df.columns:
-            if 'reference' in str(col).lower() and 'designator' in str(col).lower():
-                designator_col = col
-                break
-        
-        if not designator_col:
-            designator_col = df.columns[2] if len(df.columns) > 2 else df.columns[0]
-        
-        crd_col = None
-        result_col = None
-        for col in ref_df.columns:
-            col_lower = str(col).lower()
-            if 'crd' in col_lower:
-                crd_col = col
-            elif 'result' in col_lower:
-                result_col = col
-        
-        if not crd_col or not result_col:
-            ref_cols = ref_df.columns.tolist()
-            if len(ref_cols) >= 2:
-                crd_col = ref_cols[0] if not crd_col else crd_col
-                result_col = ref_cols[1] if not result_col else result_col
+        missing = await analysis.missing_components()
         
-        fmeca_designators = set()
-        for designator_str in df[designator_col]:
-            extracted = extract_designators(designator_str)
-            fmeca_designators.update(extracted)
-        
-        iigd_designators = set()
-        for crd_str in ref_df[crd_col]:
-            extracted = extract_complete_designators(crd_str)
-            iigd_designators.update(extracted)
-        
-        truly_missing = set()
-        for iigd_designator in iigd_designators:
-            designator_clean = iigd_designator.upper().strip()
-            found = False
-            
-            for fmeca_designator in fmeca_designators:
-                if (designator_clean == fmeca_designator or 
-                    f"({designator_clean})" in fmeca_designator or 
-                    designator_clean in fmeca_designator.split()):
-                    found = True
-                    break
-            
-            if not found:
-                truly_missing.add(iigd_designator)
-        
-        truly_missing = {d for d in truly_missing if d and len(d) > 1 and d not in ['NAN', 'NONE', 'NAT', 'NULL', 'NA']}
-        
-        missing_components = []
-        for missing_designator in sorted(truly_missing):
-            result_value = "Not Found"
-            for _, row in ref_df.iterrows():
-                crd = str(row[crd_col])
-                result_val = str(row[result_col])
-                crd_designators = extract_complete_designators(crd)
-                if missing_designator in crd_designators:
-                    result_value = result_val
-                    break
-            
-            missing_components.append(MissingComponent(
-                component=missing_designator,
-                atm_coverage=result_value
-            ))
+        # ATMResponse-shaped, built as plain dicts and returned as a response so FastAPI
+        # skips validating and re-encoding one MissingComponent per designator
+        missing_components = [
+            {"component": designator, "atm_coverage": result_value}
+            for designator, result_value in missing
+        ]
         
         if missing_components:
-            message = f"ATM Check: {len(truly_missing)} values found in coverage but missing in FMECA"
+            message = f"ATM Check: {len(missing_components)} values found in coverage but missing in FMECA"
         else:
             message = "🎉 ATM Check: All coverage values are present in FMECA"
         
-        return ATMResponse(
-            missing_components=missing_components,
-            message=message
+        return FastJSONResponse(
+            {"missing_components": missing_components, "message": message},
+            headers=cache_headers(etag)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error in ATM check: {e}")
         return ATMResponse(
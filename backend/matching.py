@@ -0,0 +1,221 @@
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+
+# A "(X12)" designator always satisfies the word-bounded patterns too, so the
+# parenthesized patterns these once ran alongside never added a designator
+STANDALONE_DESIGNATOR = re.compile(r'\b([A-Z]{1,10}\d{1,4}[A-Z]?\d?)\b')
+SPACELESS_DESIGNATOR = re.compile(r'[A-Z]{1,10}\s*\d{1,4}[A-Z]?\d?')
+COMPLETE_DESIGNATOR = re.compile(r'\b([A-Z]{1,10}\d{1,4}(?:[A-Z]\d?)?)\b')
+
+def extract_designators(text: str) -> set:
+    if pd.isna(text) or text == '':
+        return set()
+
+    text = str(text).upper().strip()
+    designators = set(STANDALONE_DESIGNATOR.findall(text))
+
+    # Designators split by spaces ("R 12") are matched on the text without spaces
+    designators.update(SPACELESS_DESIGNATOR.findall(text.replace(' ', '')))
+
+    return designators
+
+def extract_complete_designators(text: str) -> set:
+    if pd.isna(text) or text == '':
+        return set()
+
+    return set(COMPLETE_DESIGNATOR.findall(str(text).upper().strip()))
+
+def extract_designators_batch(values: Iterable) -> List[frozenset]:
+    """extract_designators of every cell; equal cells share one set"""
+    return _extract_batch(values, extract_designators)
+
+def extract_complete_designators_batch(values: Iterable) -> List[frozenset]:
+    """extract_complete_designators of every cell; equal cells share one set"""
+    return _extract_batch(values, extract_complete_designators)
+
+def _extract_batch(values: Iterable, extract: Callable[[str], set]) -> List[frozenset]:
+    # Forward-filled sheets repeat cells a lot, so each distinct cell is tokenized once.
+    # Cells equal across types (1 == 1.0 == True) have no letters, so no designators either.
+    seen = {}
+    designator_sets = []
+    for value in values:
+        designators = seen.get(value)
+        if designators is None:
+            designators = seen[value] = frozenset(extract(value))
+        designator_sets.append(designators)
+    return designator_sets
+
+# ==================== COVERAGE MATCHING ENGINE ====================
+
+def build_coverage_index(crd_values: Iterable) -> Tuple[Dict[str, int], List[int]]:
+    """Map every coverage designator to the last coverage row that lists it"""
+    last_row = {}
+    cells = (str(crd).strip() for crd in crd_values)
+    for position, designators in enumerate(extract_complete_designators_batch(cells)):
+        for designator in designators:
+            last_row[designator] = position
+
+    lengths = sorted({len(designator) for designator in last_row})
+    return last_row, lengths
+
+def match_atm_coverage(
+    designator_values: Iterable[str],
+    crd_values: Iterable,
+    result_values: Iterable,
+    default: str = "Not Found",
+    last_row: Optional[Dict[str, int]] = None,
+    match_keys: Optional[Dict[str, List[str]]] = None
+) -> List[str]:
+    """
+    Resolve the ATM coverage result for each FMECA designator string.
+
+    A FMECA row takes the result of the last coverage row having a designator
+    that appears anywhere in its (upper-cased) designator string, which is the
+    same last-writer-wins outcome as applying one str.contains mask per
+    coverage designator in coverage row order. A last_row map precomputed
+    with build_coverage_index replaces the scan of crd_values, and the
+    designator_match_keys of each string (match_keys, by string) replace
+    the substring scan.
+    """
+    results = [str(value) for value in result_values]
+    if last_row is None:
+        last_row, lengths = build_coverage_index(crd_values)
+    else:
+        lengths = sorted({len(designator) for designator in last_row})
+
+    coverage = []
+    if match_keys is not None:
+        for text in designator_values:
+            text = str(text)
+            keys = match_keys.get(text)
+            if keys is None:
+                keys = designator_match_keys(text)
+            best = -1
+            for key in keys:
+                position = last_row.get(key)
+                if position is not None and position > best:
+                    best = position
+            coverage.append(results[best] if best >= 0 else default)
+        return coverage
+
+    for text in designator_values:
+        text = str(text)
+        text_length = len(text)
+        best = -1
+
+        if last_row:
+            for start, char in enumerate(text):
+                # Every designator starts with a letter A-Z
+                if not 'A' <= char <= 'Z':
+                    continue
+                for length in lengths:
+                    if start + length > text_length:
+                        break
+                    position = last_row.get(text[start:start + length])
+                    if position is not None and position > best:
+                        best = position
+
+        coverage.append(results[best] if best >= 0 else default)
+
+    return coverage
+
+def designator_match_keys(text: str) -> List[str]:
+    """
+    Every substring of an upper-cased designator string shaped like a
+    coverage designator ([A-Z]{1,10}, 1-4 digits, optional letter and
+    digit). These are the only substrings match_atm_coverage can find in
+    a coverage index, so they depend on the FMECA text alone.
+    """
+    keys = []
+    length = len(text)
+    letters_end = 0
+    for start in range(length):
+        if not 'A' <= text[start] <= 'Z':
+            continue
+        if start >= letters_end:
+            letters_end = start
+            while letters_end < length and 'A' <= text[letters_end] <= 'Z':
+                letters_end += 1
+        # The letters of a key run up to the first digit
+        if letters_end - start > 10:
+            continue
+        digits_end = letters_end
+        while digits_end < length and digits_end - letters_end < 5 and text[digits_end].isdecimal():
+            digits_end += 1
+        digit_count = digits_end - letters_end
+        for end in range(letters_end + 1, letters_end + min(digit_count, 4) + 1):
+            keys.append(text[start:end])
+        # A letter suffix can only follow the whole digit run
+        if 1 <= digit_count <= 4 and digits_end < length and 'A' <= text[digits_end] <= 'Z':
+            keys.append(text[start:digits_end + 1])
+            if digits_end + 1 < length and text[digits_end + 1].isdecimal():
+                keys.append(text[start:digits_end + 2])
+    return keys
+
+def build_match_keys(designator_values: Iterable) -> Tuple[List[str], List[List[str]]]:
+    """Distinct designator strings (as str) and the designator_match_keys of each"""
+    texts = list(dict.fromkeys(str(text) for text in designator_values))
+    return texts, [designator_match_keys(text) for text in texts]
+
+# ==================== MISSING DESIGNATOR DETECTION ====================
+
+IGNORED_DESIGNATORS = {'NAN', 'NONE', 'NAT', 'NULL', 'NA'}
+
+def build_fmeca_designator_sets(designator_values: Iterable) -> Tuple[set, set]:
+    """Build the whitespace-token set and the parenthesized-form set of all FMECA designators"""
+    tokens = set()
+    parenthesized = set()
+    for designators in set(extract_designators_batch(designator_values)):
+        for fmeca_designator in designators:
+            tokens.update(fmeca_designator.split())
+            if '(' in fmeca_designator:
+                parenthesized.update(re.findall(r'\(([^()]*)\)', fmeca_designator))
+    return tokens, parenthesized
+
+def build_first_row_map(crd_values: Iterable) -> Dict[str, int]:
+    """Map every coverage designator to the first coverage row that lists it"""
+    first_row = {}
+    for position, designators in enumerate(extract_complete_designators_batch(crd_values)):
+        for designator in designators:
+            if designator not in first_row:
+                first_row[designator] = position
+    return first_row
+
+def find_missing_designators(
+    designator_values: Iterable,
+    crd_values: Iterable,
+    result_values: Iterable,
+    fmeca_sets: Optional[Tuple[set, set]] = None,
+    first_row: Optional[Dict[str, int]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Return sorted (designator, result) pairs for coverage designators absent from FMECA.
+
+    A coverage designator is present when it equals a whitespace token of a
+    FMECA designator or appears in one as "(designator)". Precomputed
+    fmeca_sets (build_fmeca_designator_sets) and first_row
+    (build_first_row_map) replace the scans of designator_values and
+    crd_values.
+    """
+    if fmeca_sets is None:
+        fmeca_sets = build_fmeca_designator_sets(designator_values)
+    tokens, parenthesized = fmeca_sets
+
+    if first_row is None:
+        first_row = build_first_row_map(crd_values)
+    results = [str(value) for value in result_values]
+    first_result = {designator: results[position] for designator, position in first_row.items()}
+
+    missing = []
+    for designator in sorted(first_result):
+        designator_clean = designator.upper().strip()
+        if designator_clean in tokens or designator_clean in parenthesized:
+            continue
+        if len(designator) <= 1 or designator in IGNORED_DESIGNATORS:
+            continue
+        missing.append((designator, first_result[designator]))
+
+    return missing
@@ -0,0 +1,127 @@
+"""
+Convert stored excel_files records to the current storage format and
+build the designator indexes missing (or outdated) for older uploads.
+
+Run from the backend folder (uses the same .env as the API):
+
+    python migrate.py --dry-run
+    python migrate.py
+"""
+import argparse
+import asyncio
+
+import bson
+
+from analysis import build_designator_index, detect_column_roles, role_columns, DESIGNATOR_INDEX_VERSION
+from auth import db
+from ingest import (
+    dataframe_to_stored_data, detect_storage_format, split_stored_data,
+    stored_data_to_dataframe, STORAGE_FORMAT_VERSION
+)
+from storage import (
+    create_chunk_indexes, delete_chunks, designator_indexes_collection, load_stored_data,
+    save_chunks, save_designator_index
+)
+
+excel_files_collection = db.excel_files
+
+async def migrate_storage_format(dry_run: bool, board_id: int = None):
+    query = {"storage_format": {"$ne": STORAGE_FORMAT_VERSION}}
+    if board_id is not None:
+        query["board_id"] = board_id
+
+    if not dry_run:
+        await create_chunk_indexes()
+
+    migrated = 0
+    size_before = 0
+    size_after = 0
+
+    async for record in excel_files_collection.find(query):
+        if detect_storage_format(record["data"]) == STORAGE_FORMAT_VERSION:
+            continue
+
+        df = stored_data_to_dataframe(record["data"])
+        data_dict = dataframe_to_stored_data(df)
+
+        meta, chunks = split_stored_data(data_dict)
+        before = len(bson.encode({"data": record["data"]}))
+        after = len(bson.encode({"data": meta})) + sum(len(bson.encode(chunk)) for chunk in chunks)
+        size_before += before
+        size_after += after
+
+        print(f"{'🔍' if dry_run else '✅'} {record['_id']} board {record['board_id']} "
+              f"{record['file_type']} v{record.get('version', 1)}: "
+              f"{len(df)} rows in {len(chunks)} chunks, {before / 1024:.1f} KB -> {after / 1024:.1f} KB")
+
+        if not dry_run:
+            # Drop chunks left behind by an interrupted earlier run
+            await delete_chunks([record["_id"]])
+            meta = await save_chunks(record["_id"], data_dict)
+            await excel_files_collection.update_one(
+                {"_id": record["_id"]},
+                {"$set": {
+                    "data": meta,
+                    "record_count": len(df),
+                    "column_roles": record.get("column_roles") or detect_column_roles(df, record["file_type"]),
+                    "storage_format": STORAGE_FORMAT_VERSION
+                }}
+            )
+        migrated += 1
+
+    if migrated:
+        print(f"{'Would migrate' if dry_run else 'Migrated'} {migrated} records: "
+              f"{size_before / 1024:.1f} KB -> {size_after / 1024:.1f} KB "
+              f"({100 * (1 - size_after / size_before):.1f}% smaller)")
+    else:
+        print("✅ All records already use the current storage format")
+
+async def backfill_designator_indexes(dry_run: bool, board_id: int = None):
+    # Alias versions (deduplicated uploads) use the index of the file they point at
+    query = {"storage_format": STORAGE_FORMAT_VERSION, "data_file_id": {"$exists": False}}
+    if board_id is not None:
+        query["board_id"] = board_id
+
+    # Indexes built by an older DESIGNATOR_INDEX_VERSION lack lookups and are rebuilt
+    indexed_ids = {doc["_id"] async for doc in designator_indexes_collection.find(
+        {"index_version": DESIGNATOR_INDEX_VERSION}, projection={"_id": 1}
+    )}
+
+    built = 0
+    async for record in excel_files_collection.find(query):
+        if record["_id"] in indexed_ids:
+            continue
+
+        roles = record.get("column_roles")
+        if roles is None:
+            roles = detect_column_roles(stored_data_to_dataframe(await load_stored_data(record)), record["file_type"])
+        df = stored_data_to_dataframe(await load_stored_data(record, role_columns(roles)))
+        index = build_designator_index(df, record["file_type"], roles)
+
+        print(f"{'🔍' if dry_run else '✅'} {record['_id']} board {record['board_id']} "
+              f"{record['file_type']} v{record.get('version', 1)}: designator index "
+              f"({sum(len(values) for key, values in index.items() if key != 'index_version')} entries)")
+
+        if not dry_run:
+            await save_designator_index(record["_id"], index)
+            await excel_files_collection.update_one({"_id": record["_id"]}, {"$set": {"column_roles": roles}})
+        built += 1
+
+    if built:
+        print(f"{'Would build' if dry_run else 'Built'} {built} designator indexes")
+    else:
+        print("✅ All records have a current designator index")
+
+async def migrate_all(dry_run: bool, board_id: int = None):
+    await migrate_storage_format(dry_run, board_id)
+    await backfill_designator_indexes(dry_run, board_id)
+
+def main():
+    parser = argparse.ArgumentParser(description="Migrate excel_files records to the current storage format")
+    parser.add_argument("--dry-run", action="store_true", help="Report sizes without writing")
+    parser.add_argument("--board", type=int, default=None, help="Only migrate one board")
+    args = parser.parse_args()
+    asyncio.run(migrate_all(args.dry_run, args.board))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+
+# Non-str keys (numeric Excel headers) become strings as with json.dumps;
+# values orjson doesn't know (Timestamp, ObjectId) go through jsonable_encoder
+JSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def json_bytes(content: Any, newline: bool = False) -> bytes:
+    """Serialize to JSON with orjson (optionally newline-terminated, for NDJSON)"""
+    options = JSON_OPTIONS | orjson.OPT_APPEND_NEWLINE if newline else JSON_OPTIONS
+    return orjson.dumps(content, default=jsonable_encoder, option=options)
+
+
+class FastJSONResponse(ORJSONResponse):
+    """
+    Default response class of the app. Endpoints returning large payloads
+    return it directly, which also skips FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return json_bytes(content)
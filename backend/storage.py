@@ -0,0 +1,246 @@
+import bisect
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pymongo.errors import DocumentTooLarge
+
+from auth import db
+from ingest import chunked_metadata, detect_storage_format, iter_stored_chunks, rows_per_chunk, stored_column_names
+
+# Row chunks of sheets stored in format 3 (see ingest.py)
+excel_chunks_collection = db.excel_chunks
+
+# Designator lookups precomputed at upload (analysis.build_designator_index), keyed by file id
+designator_indexes_collection = db.designator_indexes
+
+# Coverage join / ATM check results of one (FMECA file, coverage file) pair
+analysis_results_collection = db.analysis_results
+
+# Row keys and hashes of each file (ingest.build_row_index), keyed by file id
+row_indexes_collection = db.row_indexes
+
+# Added / removed / changed rows of a file against the version before it, keyed by the newer file id
+excel_diffs_collection = db.excel_diffs
+
+async def create_chunk_indexes():
+    await excel_chunks_collection.create_index([("file_id", 1), ("seq", 1)], unique=True)
+    await excel_chunks_collection.create_index([("file_id", 1), ("row_start", 1)])
+    await analysis_results_collection.create_index([("fmeca_id", 1)])
+    await analysis_results_collection.create_index([("coverage_id", 1)])
+    await excel_diffs_collection.create_index([("from_id", 1)])
+
+async def save_chunks(
+    file_id: str, data: dict, progress: Optional[Callable[[int], Awaitable[None]]] = None
+) -> dict:
+    """
+    Write the rows of a format 2 "data" field as chunks and return the
+    format 3 metadata. progress, if given, is awaited with the number of
+    rows stored after each chunk.
+    """
+    chunk_rows = rows_per_chunk(data)
+    # One insert per chunk, so only one chunk's slices are held besides the sheet
+    for chunk in iter_stored_chunks(data, chunk_rows):
+        chunk["file_id"] = file_id
+        await excel_chunks_collection.insert_one(chunk)
+        if progress is not None:
+            await progress(min(chunk["row_start"] + chunk_rows, data["shape"][0]))
+    return chunked_metadata(data, chunk_rows)
+
+async def delete_chunks(file_ids: List[str]) -> int:
+    """Delete the chunks, designator / row indexes, diffs and analysis results of the given files"""
+    await designator_indexes_collection.delete_many({"_id": {"$in": file_ids}})
+    await row_indexes_collection.delete_many({"_id": {"$in": file_ids}})
+    await delete_file_results(file_ids)
+    result = await excel_chunks_collection.delete_many({"file_id": {"$in": file_ids}})
+    return result.deleted_count
+
+async def delete_file_results(file_ids: List[str]):
+    """Delete the diffs and analysis results involving the given files"""
+    await excel_diffs_collection.delete_many({"$or": [{"_id": {"$in": file_ids}}, {"from_id": {"$in": file_ids}}]})
+    await analysis_results_collection.delete_many(
+        {"$or": [{"fmeca_id": {"$in": file_ids}}, {"coverage_id": {"$in": file_ids}}]}
+    )
+
+def stored_file_id(record: dict) -> str:
+    """Id the rows and indexes of a record are stored under (alias versions share another file's)"""
+    return record.get("data_file_id", record["_id"])
+
+def _project_chunk_columns(positions: List[int]) -> dict:
+    """$project stage keeping only the given column arrays of a chunk, as c0, c1, ..."""
+    return {"$project": {"_id": 0, "row_start": 1, **{
+        f"c{index}": {"$arrayElemAt": ["$arrays", position]}
+        for index, position in enumerate(positions)
+    }}}
+
+async def iter_stored_rows(record: dict, columns: List, start: int, stop: int) -> AsyncIterator[List[tuple]]:
+    """
+    Yield rows [start, stop) of a stored sheet as value tuples (in the
+    order of columns), one batch per chunk. Chunked sheets seek straight
+    to the chunk holding start and read only the wanted columns; inline
+    (format 1/2) sheets are sliced from the document.
+    """
+    data = record["data"]
+    storage_format = detect_storage_format(data)
+
+    if storage_format == 3:
+        positions = [data["columns"].index(column) for column in columns]
+        first_chunk = await excel_chunks_collection.find_one(
+            {"file_id": stored_file_id(record), "row_start": {"$lte": start}},
+            projection={"row_start": 1},
+            sort=[("row_start", -1)]
+        )
+        first_row_start = first_chunk["row_start"] if first_chunk else 0
+
+        pipeline = [
+            {"$match": {"file_id": stored_file_id(record), "row_start": {"$gte": first_row_start, "$lt": stop}}},
+            {"$sort": {"row_start": 1}},
+            _project_chunk_columns(positions)
+        ]
+        async for chunk in excel_chunks_collection.aggregate(pipeline):
+            arrays = [chunk[f"c{index}"] for index in range(len(positions))]
+            row_start = chunk["row_start"]
+            chunk_rows = len(arrays[0]) if arrays else 0
+            begin = max(start, row_start) - row_start
+            end = min(stop, row_start + chunk_rows) - row_start
+            if begin < end:
+                yield list(zip(*(values[begin:end] for values in arrays)))
+        return
+
+    if storage_format == 2:
+        positions = [data["columns"].index(column) for column in columns]
+        yield list(zip(*(data["arrays"][position][start:stop] for position in positions)))
+        return
+
+    rows = data["data"] if isinstance(data, dict) else data
+    yield [tuple(row.get(column) for column in columns) for row in rows[start:stop]]
+
+async def save_designator_index(file_id: str, index: dict) -> bool:
+    """Store the designator index of a file; analysis falls back to regex scans without it"""
+    try:
+        await designator_indexes_collection.replace_one({"_id": file_id}, {"_id": file_id, **index}, upsert=True)
+        return True
+    except DocumentTooLarge:
+        print(f"⚠️ Designator index of {file_id} exceeds the document size limit, not stored")
+        return False
+
+async def load_designator_index(file_id: str) -> Optional[dict]:
+    return await designator_indexes_collection.find_one({"_id": file_id}, projection={"_id": 0})
+
+async def save_row_index(file_id: str, index: dict) -> bool:
+    """Store the row index of a file; diffs rebuild it from the sheet without it"""
+    try:
+        await row_indexes_collection.replace_one({"_id": file_id}, {"_id": file_id, **index}, upsert=True)
+        return True
+    except DocumentTooLarge:
+        print(f"⚠️ Row index of {file_id} exceeds the document size limit, not stored")
+        return False
+
+async def load_row_index(file_id: str) -> Optional[dict]:
+    return await row_indexes_collection.find_one({"_id": file_id}, projection={"_id": 0})
+
+async def save_row_diff(file_id: str, diff: dict) -> bool:
+    """Store the diff of a file against an earlier one; it is recomputed from row indexes without it"""
+    try:
+        await excel_diffs_collection.replace_one({"_id": file_id}, {"_id": file_id, **diff}, upsert=True)
+        return True
+    except DocumentTooLarge:
+        print(f"⚠️ Diff of {file_id} exceeds the document size limit, not stored")
+        return False
+
+async def load_row_diff(from_id: str, to_id: str) -> Optional[dict]:
+    return await excel_diffs_collection.find_one({"_id": to_id, "from_id": from_id}, projection={"_id": 0})
+
+async def load_stored_rows_at(record: dict, positions: List[int]) -> Dict[int, tuple]:
+    """
+    Get rows of a stored sheet by position, as {position: value tuple (in
+    column order)}. Chunked sheets read only the chunks holding them.
+    """
+    data = record["data"]
+    storage_format = detect_storage_format(data)
+    wanted = sorted(set(positions))
+    if not wanted:
+        return {}
+
+    if storage_format == 3:
+        starts = [chunk["row_start"] async for chunk in excel_chunks_collection.find(
+            {"file_id": stored_file_id(record)}, projection={"_id": 0, "row_start": 1}
+        ).sort("row_start", 1)]
+        chunk_starts = sorted({starts[bisect.bisect_right(starts, position) - 1] for position in wanted})
+
+        rows = {}
+        async for chunk in excel_chunks_collection.find(
+            {"file_id": stored_file_id(record), "row_start": {"$in": chunk_starts}},
+            projection={"_id": 0, "row_start": 1, "arrays": 1}
+        ):
+            row_start = chunk["row_start"]
+            chunk_rows = len(chunk["arrays"][0]) if chunk["arrays"] else 0
+            for position in wanted[bisect.bisect_left(wanted, row_start):bisect.bisect_left(wanted, row_start + chunk_rows)]:
+                rows[position] = tuple(values[position - row_start] for values in chunk["arrays"])
+        return rows
+
+    if storage_format == 2:
+        return {position: tuple(values[position] for values in data["arrays"]) for position in wanted}
+
+    columns = stored_column_names(data)
+    records = data["data"] if isinstance(data, dict) else data
+    return {position: tuple(records[position].get(column) for column in columns) for position in wanted}
+
+def analysis_result_id(fmeca_id: str, coverage_id: str, result_version: int) -> str:
+    # Results of another result version are never read back (they go when either file is deleted)
+    return f"{fmeca_id}:{coverage_id}:v{result_version}"
+
+async def save_analysis_result(fmeca_id: str, coverage_id: str, result_version: int, fields: dict) -> bool:
+    """Store (part of) the analysis results of a file pair; they are recomputed without it"""
+    try:
+        await analysis_results_collection.update_one(
+            {"_id": analysis_result_id(fmeca_id, coverage_id, result_version)},
+            {"$set": {"fmeca_id": fmeca_id, "coverage_id": coverage_id, **fields}},
+            upsert=True
+        )
+        return True
+    except DocumentTooLarge:
+        print(f"⚠️ Analysis results of {fmeca_id} / {coverage_id} exceed the document size limit, not stored")
+        return False
+
+async def load_analysis_result(fmeca_id: str, coverage_id: str, result_version: int) -> Optional[dict]:
+    return await analysis_results_collection.find_one(
+        {"_id": analysis_result_id(fmeca_id, coverage_id, result_version)}, projection={"_id": 0}
+    )
+
+async def load_stored_data(record: dict, columns: Optional[List] = None) -> dict:
+    """
+    Get the "data" field of an excel_files document with chunked rows
+    assembled back into per-column lists (format 2). Chunks are streamed
+    and appended one at a time, so only the column lists are held in full.
+    When columns are given, only those columns are read from chunked data.
+    """
+    data = record["data"]
+    if detect_storage_format(data) != 3:
+        return data
+
+    if columns is None:
+        columns = data["columns"]
+    positions = [data["columns"].index(column) for column in columns]
+
+    pipeline = [
+        {"$match": {"file_id": stored_file_id(record)}},
+        {"$sort": {"seq": 1}},
+        _project_chunk_columns(positions)
+    ]
+
+    arrays = [[] for _ in columns]
+    seen_chunks = 0
+    async for chunk in excel_chunks_collection.aggregate(pipeline):
+        for index, values in enumerate(arrays):
+            values.extend(chunk[f"c{index}"])
+        seen_chunks += 1
+
+    if seen_chunks != data["chunk_count"]:
+        raise ValueError(f"Stored sheet {record['_id']} is incomplete: "
+                         f"{seen_chunks} of {data['chunk_count']} chunks found")
+
+    return {
+        "columns": list(columns),
+        "arrays": arrays,
+        "dtypes": {column: data["dtypes"].get(column) for column in columns},
+        "shape": [data["shape"][0], len(columns)]
+    }
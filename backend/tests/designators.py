@@ -0,0 +1,134 @@
+"""Original designator matching code and generated boards, shared by the tests and benchmark.py"""
+import random
+import re
+
+import pandas as pd
+
+from matching import extract_designators, extract_complete_designators
+
+# Reference designator / CRD strings in the shapes seen in real board exports
+RCD_CORPUS = [
+    "R12", "r12", " C3 ", "U4A", "U4A1", "Q10B2", "TP101", "FB7",
+    "R1, R2, R3", "R1,R2,R3", "R1 R2 R3", "C10 C1 C100", "R1/R2", "R1-R4",
+    "IC(U12)", "(U12)", "Buffer (U7B)", "U7 (U7A) (U7B)", "C 12", "L 3A",
+    "SW1; SW2", "J1.1", "J2-PIN4", "CONN J5", "D1 & D2", "LED(D14)",
+    "NaN", "None", "NULL", "N/A", "-", "", "TBD", "RN1A", "RPACK12",
+    "U1000", "U10000", "ABCDEFGHIJK1", "XTAL1", "Y1 (X1)", "R5 R5 R5",
+]
+
+# ==================== SYNTHETIC BOARDS ====================
+
+DESIGNATOR_PREFIXES = ['R', 'C', 'U', 'D', 'L', 'Q', 'J', 'TP', 'FB', 'SW']
+COVERAGE_RESULTS = ['Pass', 'Fail', 'Covered', 'Partial', 'Not Tested']
+
+def random_designator(rng: random.Random) -> str:
+    return f"{rng.choice(DESIGNATOR_PREFIXES)}{rng.randint(1, 9999)}"
+
+def make_synthetic_board(rows: int, seed: int = 0):
+    """Build (fmeca_df, coverage_df) shaped like the uploaded Excel sheets"""
+    rng = random.Random(seed)
+
+    fmeca_rows = []
+    for index in range(rows):
+        designators = [random_designator(rng) for _ in range(rng.randint(1, 4))]
+        if rng.random() < 0.2:
+            designators[-1] = f"({designators[-1]})"
+        fmeca_rows.append({
+            "ID": f"FM-{index + 1}",
+            "Component": f"Component {index + 1}",
+            "Reference Designator": ", ".join(designators),
+            "RPN": rng.randint(1, 100)
+        })
+
+    coverage_rows = []
+    for _ in range(rows):
+        designators = [random_designator(rng) for _ in range(rng.randint(1, 3))]
+        coverage_rows.append({
+            "CRD": " ".join(designators),
+            "Result": rng.choice(COVERAGE_RESULTS)
+        })
+
+    return pd.DataFrame(fmeca_rows), pd.DataFrame(coverage_rows)
+
+# Designator-like pieces plus separators, lower case, tabs and non-ASCII letters/digits
+TOKENIZER_PIECES = (
+    list("ABCDJLQRUXYZ") + list("abcruz") + list("0123456789") * 2 +
+    list(" ()-,/;.&_#") + ["\t", "\n", "É", "ß", "ı", "٣", "²", "(", ")", " (", ") "] +
+    ["R1", "C10", "U4A", "U4A1", "TP101", "ABCDEFGHIJK", "12345"]
+)
+
+def random_designator_text(rng: random.Random) -> str:
+    return "".join(rng.choice(TOKENIZER_PIECES) for _ in range(rng.randint(0, 12)))
+
+# ==================== ORIGINAL IMPLEMENTATIONS ====================
+
+def reference_extract_designators(text: str) -> set:
+    """The original three-pass extract_designators"""
+    if pd.isna(text) or text == '':
+        return set()
+
+    text = str(text).upper().strip()
+    designators = set()
+    designators.update(re.findall(r'\(([A-Z]{1,3}\d{1,4}[A-Z]?\d?)\)', text))
+    designators.update(re.findall(r'\b([A-Z]{1,10}\d{1,4}[A-Z]?\d?)\b', text))
+    designators.update(re.findall(r'[A-Z]{1,10}\s*\d{1,4}[A-Z]?\d?', text.replace(' ', '')))
+    return designators
+
+def reference_extract_complete_designators(text: str) -> set:
+    """The original two-pass extract_complete_designators"""
+    if pd.isna(text) or text == '':
+        return set()
+
+    text = str(text).upper().strip()
+    designators = set()
+    designators.update(re.findall(r'\b([A-Z]{1,10}\d{1,4}(?:[A-Z]\d?)?)\b', text))
+    designators.update(re.findall(r'\(([A-Z]{1,10}\d{1,4}(?:[A-Z]\d?)?)\)', text))
+    return designators
+
+def legacy_coverage_join(designators: pd.Series, ref_df: pd.DataFrame, default: str = "Not Found") -> list:
+    """The original per-designator str.contains loop from get_fmeca_data"""
+    frame = pd.DataFrame({"designator": designators.astype(str).str.upper()})
+    frame["ATM Coverage"] = default
+    crd_values = ref_df["CRD"].astype(str).str.upper()
+
+    for crd, result_val in zip(crd_values, ref_df["Result"]):
+        for designator in extract_complete_designators(str(crd).strip()):
+            mask = frame["designator"].str.contains(re.escape(designator), na=False, regex=True)
+            frame.loc[mask, "ATM Coverage"] = str(result_val)
+
+    return frame["ATM Coverage"].tolist()
+
+def legacy_atm_check(designators: pd.Series, ref_df: pd.DataFrame) -> list:
+    """The original nested-loop missing designator detection from atm_check"""
+    fmeca_designators = set()
+    for designator_str in designators:
+        fmeca_designators.update(extract_designators(designator_str))
+
+    iigd_designators = set()
+    for crd_str in ref_df["CRD"]:
+        iigd_designators.update(extract_complete_designators(crd_str))
+
+    truly_missing = set()
+    for iigd_designator in iigd_designators:
+        designator_clean = iigd_designator.upper().strip()
+        found = False
+        for fmeca_designator in fmeca_designators:
+            if (designator_clean == fmeca_designator or
+                f"({designator_clean})" in fmeca_designator or
+                designator_clean in fmeca_designator.split()):
+                found = True
+                break
+        if not found:
+            truly_missing.add(iigd_designator)
+
+    truly_missing = {d for d in truly_missing if d and len(d) > 1 and d not in ['NAN', 'NONE', 'NAT', 'NULL', 'NA']}
+
+    missing = []
+    for missing_designator in sorted(truly_missing):
+        result_value = "Not Found"
+        for _, row in ref_df.iterrows():
+            if missing_designator in extract_complete_designators(str(row["CRD"])):
+                result_value = str(row["Result"])
+                break
+        missing.append((missing_designator, result_value))
+    return missing
@@ -0,0 +1,130 @@
+"""
+Tests for the stored sheet layout and the row-level diff.
+
+Run from the backend folder:
+
+    python -m pytest tests
+"""
+import random
+from datetime import datetime
+
+import bson
+import pandas as pd
+import pytest
+
+from ingest import build_row_index, dataframe_to_stored_data, diff_row_indexes, hashed_cell
+
+# ==================== ROW DIFF ====================
+
+def full_sheet_diff(old_df: pd.DataFrame, new_df: pd.DataFrame, key_column=None) -> dict:
+    """
+    Diff two versions by comparing whole rows: per key, identical rows
+    first, then the rows left paired in order (keyless sheets by content only)
+    """
+    def rows(df):
+        clean_df = df.astype(object).where(df.notna(), None)
+        for position, row in enumerate(clean_df.itertuples(index=False)):
+            key = None
+            if key_column is not None:
+                value = row[df.columns.get_loc(key_column)]
+                key = "" if value is None else str(value)
+            yield key, position, tuple(row)
+
+    old_by_key, new_by_key = {}, {}
+    for key, position, row in rows(old_df):
+        old_by_key.setdefault(key, []).append((position, row))
+    for key, position, row in rows(new_df):
+        new_by_key.setdefault(key, []).append((position, row))
+
+    added, removed, changed, unchanged = [], [], [], 0
+    for key in old_by_key.keys() | new_by_key.keys():
+        old_rows = list(old_by_key.get(key, []))
+        new_left = []
+        for position, row in new_by_key.get(key, []):
+            match = next((old for old in old_rows if old[1] == row), None)
+            if match is None:
+                new_left.append(position)
+            else:
+                old_rows.remove(match)
+                unchanged += 1
+        if key_column is None:
+            added += new_left
+            removed += [position for position, _ in old_rows]
+            continue
+        pairs = min(len(old_rows), len(new_left))
+        changed += [[old_rows[index][0], new_left[index]] for index in range(pairs)]
+        added += new_left[pairs:]
+        removed += [position for position, _ in old_rows[pairs:]]
+
+    return {
+        "added": sorted(added),
+        "removed": sorted(removed),
+        "changed": sorted(changed, key=lambda pair: pair[1]),
+        "unchanged": unchanged
+    }
+
+def random_sheet(rng: random.Random, rows: int, key_count: int) -> pd.DataFrame:
+    """A sheet whose ID column repeats keys and has missing cells"""
+    ids = [rng.choice([None, float("nan")]) if rng.random() < 0.1 else f"FM-{rng.randint(1, key_count)}"
+           for _ in range(rows)]
+    return pd.DataFrame({
+        "ID": ids,
+        "Component": [rng.choice(["R", "C", "U"]) + str(rng.randint(1, 3)) for _ in range(rows)],
+        "RPN": [rng.choice([None, 10, 20]) for _ in range(rows)],
+    })
+
+def edit_sheet(rng: random.Random, df: pd.DataFrame) -> pd.DataFrame:
+    """A next version: some rows edited, dropped, duplicated and shuffled"""
+    edited = df.copy()
+    for position in rng.sample(range(len(df)), len(df) // 5):
+        edited.iloc[position, edited.columns.get_loc("Component")] = f"Edited {position}"
+    edited = edited.drop(index=rng.sample(range(len(df)), len(df) // 5))
+    extra = random_sheet(rng, len(df) // 5, len(df))
+    edited = pd.concat([edited, extra, edited.head(3)], ignore_index=True)
+    return edited.sample(frac=1, random_state=rng.randint(0, 1000)).reset_index(drop=True)
+
+@pytest.mark.parametrize("key_column", ["ID", None], ids=["keyed", "keyless"])
+@pytest.mark.parametrize("seed", range(5))
+def test_row_diff_matches_full_sheet_comparison(seed, key_column):
+    rng = random.Random(seed)
+    old_df = random_sheet(rng, 60, 20)
+    new_df = edit_sheet(rng, old_df)
+
+    old_index = build_row_index(dataframe_to_stored_data(old_df), key_column)
+    new_index = build_row_index(dataframe_to_stored_data(new_df), key_column)
+    assert diff_row_indexes(old_index, new_index) == full_sheet_diff(old_df, new_df, key_column)
+
+def test_row_diff_duplicate_and_missing_keys():
+    old_df = pd.DataFrame({"ID": ["A", "A", None, "B"], "Component": ["R1", "R2", "C1", "U1"]})
+    new_df = pd.DataFrame({"ID": ["A", "A", "A", None, None], "Component": ["R2", "R9", "R1", "C2", "C1"]})
+
+    diff = diff_row_indexes(
+        build_row_index(dataframe_to_stored_data(old_df), "ID"),
+        build_row_index(dataframe_to_stored_data(new_df), "ID")
+    )
+    # "A" rows R2 and R1 are unchanged however they move; R9 is the one added under "A"
+    assert diff == {"added": [1, 3], "removed": [3], "changed": [], "unchanged": 3}
+
+def test_row_index_without_key_column_in_sheet():
+    index = build_row_index(dataframe_to_stored_data(pd.DataFrame({"Component": ["R1"]})), "ID")
+    assert index["key_column"] is None and index["keys"] is None
+
+# ==================== DATETIME CELLS ====================
+
+def test_timestamp_hashes_like_datetime_from_mongo():
+    timestamp = pd.Timestamp("2024-03-04 05:06:07.123456")
+    assert hashed_cell(timestamp) == hashed_cell(datetime(2024, 3, 4, 5, 6, 7, 123000))
+    assert hashed_cell(timestamp) != hashed_cell(datetime(2024, 3, 4, 5, 6, 7, 124000))
+
+def test_row_index_rebuilt_from_mongo_matches_parsed_sheet():
+    df = pd.DataFrame({
+        "ID": ["A", "B", "C"],
+        "Tested": pd.to_datetime(["2024-01-01", None, "2024-01-02 00:00:00.123456"], format="ISO8601"),
+        # Mixed object column, as openpyxl returns for text and date cells
+        "Notes": ["ok", pd.Timestamp("2024-05-06 07:08:09.987654"), 3],
+        "RPN": [1.5, None, 3.0],
+    })
+    data = dataframe_to_stored_data(df)
+    stored = bson.decode(bson.encode({"data": data}))["data"]
+
+    assert build_row_index(stored, "ID") == build_row_index(data, "ID")
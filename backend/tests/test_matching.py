@@ -0,0 +1,193 @@
+"""
+Tests for the designator tokenizers and matching.
+
+Run from the backend folder:
+
+    python -m pytest tests
+"""
+import random
+
+import pandas as pd
+import pytest
+
+from matching import (
+    build_coverage_index, build_first_row_map, build_match_keys, build_fmeca_designator_sets, extract_designators, extract_complete_designators,
+    extract_designators_batch, extract_complete_designators_batch, find_missing_designators, match_atm_coverage
+)
+from tests.designators import (
+    COVERAGE_RESULTS, RCD_CORPUS, legacy_atm_check, legacy_coverage_join, make_synthetic_board, random_designator_text,
+    reference_extract_designators, reference_extract_complete_designators
+)
+
+# Empty and non-string cells as they come out of pandas
+EDGE_CELLS = [None, float("nan"), pd.NA, "", 12, 3.5, True]
+
+TOKENIZERS = [
+    pytest.param(reference_extract_designators, extract_designators, extract_designators_batch,
+                 id="extract_designators"),
+    pytest.param(reference_extract_complete_designators, extract_complete_designators,
+                 extract_complete_designators_batch, id="extract_complete_designators"),
+]
+
+# ==================== TOKENIZERS ====================
+
+@pytest.mark.parametrize("reference, single, batch", TOKENIZERS)
+def test_tokenizers_match_originals(reference, single, batch):
+    rng = random.Random(0)
+    values = EDGE_CELLS + [random_designator_text(rng) for _ in range(20000)]
+    expected = [reference(value) for value in values]
+
+    assert [value for value, want in zip(values, expected) if single(value) != want] == []
+    assert [value for value, want, got in zip(values, expected, batch(values)) if got != want] == []
+
+@pytest.mark.parametrize("reference, single, batch", TOKENIZERS)
+def test_batch_shares_sets_of_equal_cells(reference, single, batch):
+    sets = batch(["R1, C2", "U3", "R1, C2"])
+    assert sets[0] is sets[2]
+    assert sets[0] == frozenset(single("R1, C2"))
+
+# ==================== RCD CORPUS ====================
+
+@pytest.mark.parametrize("text", RCD_CORPUS)
+def test_corpus_extract_designators(text):
+    assert extract_designators(text) == reference_extract_designators(text)
+
+@pytest.mark.parametrize("text", RCD_CORPUS)
+def test_corpus_extract_complete_designators(text):
+    assert extract_complete_designators(text) == reference_extract_complete_designators(text)
+
+@pytest.mark.parametrize("text, designators, complete", [
+    ("R1, R2, R3", {"R1", "R2", "R3"}, {"R1", "R2", "R3"}),
+    ("r12", {"R12"}, {"R12"}),
+    ("IC(U12)", {"U12"}, {"U12"}),
+    ("R1-R4", {"R1", "R4"}, {"R1", "R4"}),
+    ("J2-PIN4", {"J2", "PIN4"}, {"J2", "PIN4"}),
+    # Only the space-insensitive tokenizer joins "C 12"; too many digits make no complete designator
+    ("C 12", {"C12"}, set()),
+    ("U10000", {"U10000"}, set()),
+    ("ABCDEFGHIJK1", {"BCDEFGHIJK1"}, set()),
+    ("N/A", set(), set()),
+])
+def test_corpus_designators(text, designators, complete):
+    assert extract_designators(text) == designators
+    assert extract_complete_designators(text) == complete
+
+# ==================== COVERAGE JOIN ====================
+
+COVERAGE_JOIN_BOARDS = {
+    # R1 is a substring of R12 and R100; U7 of U7A: the last coverage row among them wins
+    "overlapping": (
+        ["R1", "R12", "R100 (U7A)", "U7", "C1 C12", "XR12"],
+        pd.DataFrame({"CRD": ["R12", "R1", "U7A", "U7", "C12"], "Result": ["A", "B", "C", "D", "E"]})
+    ),
+    # The same designator in several coverage rows takes the last row's result
+    "repeated": (
+        ["R5", "R5, C3", "C3", "(C3)"],
+        pd.DataFrame({"CRD": ["R5 C3", "C3", "R5", "R5, R5"], "Result": ["Pass", "Fail", "Covered", "Partial"]})
+    ),
+    "nan and numbers": (
+        [None, float("nan"), "nan", 12, 3.5, "R1", "NAN1"],
+        pd.DataFrame({"CRD": [float("nan"), None, 7, "R1", "NAN1"], "Result": [1, 2.5, None, float("nan"), True]})
+    ),
+    "corpus": (
+        RCD_CORPUS + [None],
+        pd.DataFrame({"CRD": list(reversed(RCD_CORPUS)), "Result": [f"Row {index}" for index in range(len(RCD_CORPUS))]})
+    ),
+}
+
+@pytest.mark.parametrize("default", ["Not Found", "-"])
+@pytest.mark.parametrize("precomputed", [False, True], ids=["scan", "precomputed"])
+@pytest.mark.parametrize("board", list(COVERAGE_JOIN_BOARDS))
+def test_coverage_join_matches_legacy_loop(board, precomputed, default):
+    designators, coverage_df = COVERAGE_JOIN_BOARDS[board]
+    designators = pd.Series(designators, dtype=object)
+    # Same normalization as join_coverage
+    texts = designators.astype(str).str.upper().tolist()
+    crd_values = coverage_df["CRD"].astype(str).str.upper()
+    last_row = build_coverage_index(crd_values)[0] if precomputed else None
+
+    coverage = match_atm_coverage(texts, crd_values, coverage_df["Result"], default=default, last_row=last_row)
+    assert coverage == legacy_coverage_join(designators, coverage_df, default)
+
+def test_coverage_join_overlapping_designators():
+    designators, coverage_df = COVERAGE_JOIN_BOARDS["overlapping"]
+    crd_values = coverage_df["CRD"].astype(str).str.upper()
+    assert match_atm_coverage(designators, crd_values, coverage_df["Result"]) == ["B", "B", "D", "D", "E", "B"]
+
+def test_coverage_join_synthetic_board():
+    fmeca_df, coverage_df = make_synthetic_board(300)
+    designators = fmeca_df["Reference Designator"]
+    coverage = match_atm_coverage(
+        designators.astype(str).str.upper(), coverage_df["CRD"].astype(str).str.upper(), coverage_df["Result"]
+    )
+    assert coverage == legacy_coverage_join(designators, coverage_df)
+
+# ==================== ATM CHECK ====================
+
+def corpus_boards():
+    """The RCD corpus on the FMECA side, then on the coverage side, with the other side from the corpus too"""
+    rng = random.Random(0)
+    corpus = RCD_CORPUS + [None]
+    coverage_df = pd.DataFrame({
+        "CRD": corpus + list(reversed(corpus)),
+        "Result": [rng.choice(COVERAGE_RESULTS) for _ in range(2 * len(corpus))]
+    })
+    swapped_df = pd.DataFrame({"CRD": corpus, "Result": [f"Row {index}" for index in range(len(corpus))]})
+    return [
+        (pd.Series(corpus), coverage_df),
+        (coverage_df["CRD"], swapped_df),
+        # Each corpus entry alone on one side, against the whole corpus on the other
+        *[(pd.Series([text]), swapped_df) for text in corpus],
+        *[(pd.Series(corpus), pd.DataFrame({"CRD": [text], "Result": ["Pass"]})) for text in corpus],
+    ]
+
+def synthetic_board():
+    fmeca_df, coverage_df = make_synthetic_board(150)
+    return fmeca_df["Reference Designator"], coverage_df
+
+@pytest.mark.parametrize("precomputed", [False, True], ids=["scan", "precomputed"])
+@pytest.mark.parametrize("board", ["corpus", "synthetic"])
+def test_missing_designators_match_legacy_check(board, precomputed):
+    boards = corpus_boards() if board == "corpus" else [synthetic_board()]
+    for designators, coverage_df in boards:
+        kwargs = {}
+        if precomputed:
+            kwargs = {
+                "fmeca_sets": build_fmeca_designator_sets(designators),
+                "first_row": build_first_row_map(coverage_df["CRD"])
+            }
+        expected = legacy_atm_check(designators, coverage_df)
+        assert find_missing_designators(designators, coverage_df["CRD"], coverage_df["Result"], **kwargs) == expected
+
+# ==================== MATCH KEYS ====================
+
+# Coverage designators at the limits of the complete-designator shape
+BOUNDARY_CRD = ["ABCDEFGHIJ1", "BCDEFGHIJK1", "R1234", "R2345", "U4A", "U4A1", "Q10B", "Q10B2", "R1", "É1"]
+
+BOUNDARY_TEXTS = [
+    # 11-letter prefix: only the last 10 letters can start a key
+    "ABCDEFGHIJK1", "XABCDEFGHIJ1",
+    # 5-digit runs, which no suffix letter may follow
+    "R12345", "R12345A", "R1234A", "R2345", "R23456",
+    # Suffix letter with and without a trailing digit
+    "U4A", "U4A1", "U4A12", "U4AB", "Q10B2", "Q10B", "Q10BB2",
+    # Lower case and non-ASCII letters and digits
+    "u4a1", "r1", "ÉR1", "RÉ1", "R1٣", "R1²", "ßR1", "ıR1", "É1",
+]
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_match_keys_match_substring_scan(seed):
+    rng = random.Random(seed)
+    values = RCD_CORPUS + EDGE_CELLS + BOUNDARY_TEXTS + [random_designator_text(rng) for _ in range(20000)]
+    texts = [str(value).upper() for value in values]
+    # The lower-case and non-ASCII boundary texts are also matched as they are
+    texts += BOUNDARY_TEXTS
+    crd_values = BOUNDARY_CRD + [random_designator_text(rng).upper() for _ in range(2000)]
+    results = list(range(len(crd_values)))
+    last_row, _ = build_coverage_index(crd_values)
+
+    expected = match_atm_coverage(texts, None, results, last_row=last_row)
+    match_keys = dict(zip(*build_match_keys(texts)))
+    assert match_atm_coverage(texts, None, results, last_row=last_row, match_keys=match_keys) == expected
+    # Strings missing from match_keys get their keys on the fly
+    assert match_atm_coverage(texts, None, results, last_row=last_row, match_keys={}) == expected
@@ -0,0 +1,122 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException
+
+# Worker pool configuration (CPU_WORKERS=0 runs tasks on a thread in-process)
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+CPU_QUEUE_DEPTH = int(os.getenv("CPU_QUEUE_DEPTH", str(max(1, CPU_WORKERS) * 4)))
+CPU_RETRY_AFTER = os.getenv("CPU_RETRY_AFTER", "5")
+
+CPU_BUSY_DETAIL = "Server is busy processing other requests, please retry shortly"
+
+_executor: Optional[ProcessPoolExecutor] = None
+_in_flight = 0
+_stage_stats = defaultdict(lambda: {
+    "completed": 0, "failed": 0, "rejected": 0,
+    "total_wait_seconds": 0.0, "total_run_seconds": 0.0, "max_run_seconds": 0.0
+})
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if _executor is None and CPU_WORKERS > 0:
+        # spawn: workers must not inherit the parent's Mongo client or event loop
+        _executor = ProcessPoolExecutor(
+            max_workers=CPU_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _executor
+
+def _timed_call(fn: Callable, args: tuple) -> tuple:
+    """Run fn in the worker and report how long it ran there"""
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+async def run_cpu_task(stage: str, fn: Callable, *args) -> Any:
+    """
+    Run a CPU-heavy function on the worker pool without blocking the event loop.
+
+    At most CPU_QUEUE_DEPTH tasks may be queued or running; past that the
+    request is rejected with 503 and a Retry-After header. fn and its
+    arguments must be picklable (module-level functions, DataFrames, bytes).
+    A worker that dies (killed for memory, crashed in a parser) breaks the
+    pool: its tasks get a 503 and the next task starts a new pool.
+    """
+    global _in_flight
+    stats = _stage_stats[stage]
+
+    if _in_flight >= CPU_QUEUE_DEPTH:
+        stats["rejected"] += 1
+        raise HTTPException(
+            status_code=503,
+            detail=CPU_BUSY_DETAIL,
+            headers={"Retry-After": CPU_RETRY_AFTER}
+        )
+
+    _in_flight += 1
+    submitted = time.perf_counter()
+    try:
+        executor = _get_executor()
+        if executor is None:
+            result, run_seconds = await asyncio.to_thread(_timed_call, fn, args)
+        else:
+            loop = asyncio.get_running_loop()
+            result, run_seconds = await loop.run_in_executor(executor, _timed_call, fn, args)
+    except BrokenProcessPool:
+        stats["failed"] += 1
+        _discard_executor(executor)
+        raise HTTPException(
+            status_code=503,
+            detail="A worker process stopped unexpectedly, please retry",
+            headers={"Retry-After": CPU_RETRY_AFTER}
+        )
+    except Exception:
+        stats["failed"] += 1
+        raise
+    finally:
+        _in_flight -= 1
+
+    elapsed = time.perf_counter() - submitted
+    stats["completed"] += 1
+    stats["total_run_seconds"] += run_seconds
+    stats["total_wait_seconds"] += max(0.0, elapsed - run_seconds)
+    stats["max_run_seconds"] = max(stats["max_run_seconds"], run_seconds)
+    print(f"⏱️ {stage}: {run_seconds:.3f}s run, {max(0.0, elapsed - run_seconds):.3f}s queued/transfer")
+    return result
+
+def _discard_executor(executor: ProcessPoolExecutor):
+    """Drop a broken pool (once, however many of its tasks fail) so the next task starts a new one"""
+    global _executor
+    if _executor is executor:
+        print("⚠️ Worker pool broke, starting a new one for the next task")
+        executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def shutdown_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def worker_stats() -> dict:
+    stages = {}
+    for stage, stats in _stage_stats.items():
+        completed = stats["completed"]
+        stages[stage] = {
+            **{key: round(value, 4) if isinstance(value, float) else value for key, value in stats.items()},
+            "avg_run_seconds": round(stats["total_run_seconds"] / completed, 4) if completed else None,
+            "avg_wait_seconds": round(stats["total_wait_seconds"] / completed, 4) if completed else None
+        }
+    return {
+        "workers": CPU_WORKERS,
+        "queue_depth": CPU_QUEUE_DEPTH,
+        "in_flight": _in_flight,
+        "stages": stages
+    }
@@ -75,7 +75,21 @@ function AdminDashboard({ onBack }) {
     }
   };
 
-  const handleUploadToDatabase = async (boardId, fileType, file) => {
+  // Poll a background upload job until it is done or failed
+  const waitForJob = async (jobId, onProgress) => {
+    for (;;) {
+      const response = await axios.get(`${URL}/jobs/${jobId}`, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      const job = response.data;
+      if (job.status === "done") return job.result;
+      if (job.status === "failed") throw new Error(job.error);
+      if (onProgress) onProgress(job);
+      await new Promise((resolve) => setTimeout(resolve, 1000));
+    }
+  };
+
+  const handleUploadToDatabase = async (boardId, fileType, file, onProgress) => {
     const formData = new FormData();
     formData.append("file", file);
     formData.append("file_type", fileType);
@@ -92,15 +106,16 @@ function AdminDashboard({ onBack }) {
         }
       );
 
+      // The upload is processed by a background job
+      const result = await waitForJob(response.data.job_id, onProgress);
+
       // Show success message with details
       const message =
         fileType === "image"
           ? `✅ Image uploaded successfully!`
           : `✅ Upload successful! ${
-              response.data.record_count
-            } records saved to MongoDB.\nVersion: ${
-              response.data.version || "1.0"
-            }`;
+              result.record_count
+            } records saved to MongoDB.\nVersion: ${result.version || "1.0"}`;
 
       alert(message);
       setRefreshKey((old) => old + 1); // Refresh stats
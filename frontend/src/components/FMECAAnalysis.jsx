@@ -55,13 +55,9 @@ function FMECAAnalysis({ boardId, boardName, onBack }) {
     setLoading(true);
     setError("");
     try {
+      // GET so the browser revalidates its copy with If-None-Match
       const response = await fetchWithAuth(
-        `${URL}/fmeca-data/${boardId}`,
-        {
-          board_id: boardId,
-          filter_type: activeFilter,
-        },
-        "post"
+        `${URL}/fmeca-data/${boardId}?filter_type=${encodeURIComponent(activeFilter)}`
       );
 
       if (response) {
@@ -9,6 +9,7 @@ function FileUpload({ onUploadToDatabase, onGetDbStatus }) {
   const [selectedFileType, setSelectedFileType] = useState("fmeca");
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploading, setUploading] = useState(false);
+  const [uploadJob, setUploadJob] = useState(null);
   const [boardStatus, setBoardStatus] = useState({});
   const [loading, setLoading] = useState(true);
 
@@ -73,7 +74,12 @@ function FileUpload({ onUploadToDatabase, onGetDbStatus }) {
 
     try {
       // Upload to MongoDB database
-      await onUploadToDatabase(selectedBoard, selectedFileType, selectedFile);
+      await onUploadToDatabase(
+        selectedBoard,
+        selectedFileType,
+        selectedFile,
+        setUploadJob
+      );
 
       // Reset form
       setSelectedFile(null);
@@ -91,7 +97,21 @@ function FileUpload({ onUploadToDatabase, onGetDbStatus }) {
       );
     } finally {
       setUploading(false);
+      setUploadJob(null);
+    }
+  };
+
+  const getUploadLabel = () => {
+    if (!uploadJob) return "Uploading to MongoDB...";
+    const { stage, progress, eta_seconds } = uploadJob;
+    let label = `${stage.charAt(0).toUpperCase()}${stage.slice(1)}`;
+    if (stage === "storing" && progress.rows_total) {
+      label += ` ${progress.rows_stored || 0} / ${progress.rows_total} rows`;
+    }
+    if (eta_seconds != null) {
+      label += ` (~${Math.ceil(eta_seconds)}s left)`;
     }
+    return `${label}...`;
   };
 
   const getFileTypeLabel = (type) => {
@@ -201,7 +221,7 @@ function FileUpload({ onUploadToDatabase, onGetDbStatus }) {
           onClick={handleUpload}
           disabled={uploading || !selectedBoard || !selectedFile}
         >
-          {uploading ? "Uploading to MongoDB..." : "Upload to MongoDB"}
+          {uploading ? getUploadLabel() : "Upload to MongoDB"}
         </button>
 
         <div className="upload-info">